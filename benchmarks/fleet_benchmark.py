@@ -0,0 +1,221 @@
+"""Fleet-scale benchmark for doc-flesh.
+
+Generates N synthetic doc-skeleton repositories, each with a local bare `origin`, a realistic
+set of features, templates and static files and a siteinfo.json. Then times the main operations
+and writes the results as JSON so that they can be compared between versions.
+
+    $ uv run python benchmarks/fleet_benchmark.py --sizes 10 100 1000 --output results.json
+
+Everything happens inside a temporary HOME directory, so the real ~/.config/doc-flesh and
+~/.cache/doc-flesh are never touched. The `uv` command is replaced with a stub that only
+writes a uv.lock file.
+"""
+import argparse
+import json
+import os
+import platform
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+
+from contextlib import redirect_stderr, redirect_stdout
+from datetime import datetime, timezone
+from importlib.metadata import version
+from io import StringIO
+from pathlib import Path
+
+TEMPLATES = {
+    "mkdocs.yml": """site_name: {{ site_name }}
+site_url: https://sourander.github.io/{{ site_name_slug }}/
+theme:
+  name: material
+markdown_extensions:
+  - admonition
+{%- if site_uses_mathjax %}
+  - pymdownx.arithmatex:
+      generic: true
+{%- endif %}
+""",
+    "pyproject.toml": """[project]
+name = "{{ site_name_slug }}"
+version = "0.1.0"
+requires-python = ">=3.12"
+dependencies = [
+    "mkdocs-material>=9.5",
+{%- if site_uses_precommit %}
+    "pre-commit>=4.0",
+{%- endif %}
+]
+""",
+    "README.md": """# {{ site_name }}
+
+Category: {{ category.value if category.value is defined else category }}
+{{ related_repo }}
+""",
+}
+
+STATIC_FILES = {
+    ".github/workflows/mkdocs-merge.yaml": "name: Deploy\non: [push]\n" + "# padding\n" * 200,
+    "docs/javascripts/mathjax.js": "window.MathJax = {};\n" + "// padding\n" * 2000,
+    ".pre-commit-config.yaml": "repos: []\n",
+}
+
+FEATURES = {
+    "default": {
+        "jinja_files": ["mkdocs.yml", "pyproject.toml", "README.md"],
+        "static_files": [".github/workflows/mkdocs-merge.yaml"],
+    },
+    "mathjax": {
+        "static_files": ["docs/javascripts/mathjax.js"],
+        "flags": {"site_uses_mathjax": True},
+    },
+    "precommit": {
+        "static_files": [".pre-commit-config.yaml"],
+        "flags": {"site_uses_precommit": True},
+    },
+}
+
+FAKE_UV = """#!/bin/sh
+echo "# fake uv.lock for $(basename "$PWD") $*" > uv.lock
+"""
+
+
+def git(*args: str, cwd: Path):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+def setup_home(home: Path):
+    """Create the doc-flesh config directory, the git identity and the fake uv."""
+    (home / ".gitconfig").write_text(
+        "[user]\n\tname = Benchmark\n\temail = benchmark@example.com\n[init]\n\tdefaultBranch = main\n"
+    )
+
+    config_dir = home / ".config" / "doc-flesh"
+    for name, content in TEMPLATES.items():
+        path = config_dir / "templates" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    for name, content in STATIC_FILES.items():
+        path = config_dir / "static" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    (config_dir / "features").mkdir(parents=True, exist_ok=True)
+    for name, feature in FEATURES.items():
+        (config_dir / "features" / f"{name}.yaml").write_text(json.dumps(feature))
+
+    fake_uv = home / "bin" / "uv"
+    fake_uv.parent.mkdir()
+    fake_uv.write_text(FAKE_UV)
+    fake_uv.chmod(fake_uv.stat().st_mode | stat.S_IEXEC)
+
+
+def create_fleet(home: Path, size: int) -> Path:
+    """Create `size` repositories with bare origins and write the config.yaml. Returns its path."""
+    fleet_dir = home / f"fleet-{size}"
+    entries = []
+    for i in range(size):
+        origin = fleet_dir / "origins" / f"site-{i}.git"
+        local = fleet_dir / "repos" / f"site-{i}"
+        git("init", "--bare", "-q", str(origin), cwd=home)
+        git("init", "-q", str(local), cwd=home)
+        siteinfo = {
+            "site_name": f"Site {i}",
+            "site_name_slug": f"site-{i}",
+            "category": "Study materials",
+            "related_repo": "",
+        }
+        (local / "siteinfo.json").write_text(json.dumps(siteinfo, indent=2))
+        git("add", "siteinfo.json", cwd=local)
+        git("commit", "-q", "-m", "Initial commit", cwd=local)
+        git("remote", "add", "origin", str(origin), cwd=local)
+        git("push", "-q", "-u", "origin", "main", cwd=local)
+
+        features = ["default"]
+        if i % 3 == 0:
+            features.append("mathjax")
+        if i % 5 == 0:
+            features.append("precommit")
+        entries.append({"local_path": str(local), "features": features})
+
+    config_path = home / ".config" / "doc-flesh" / "config.yaml"
+    config_path.write_text(json.dumps({"ManagedRepos": entries}))
+    return config_path
+
+
+def timed(label: str, func, results: list[dict], size: int):
+    """Run func with its output silenced and record the duration."""
+    start = time.perf_counter()
+    with redirect_stdout(StringIO()), redirect_stderr(StringIO()):
+        value = func()
+    seconds = time.perf_counter() - start
+    results.append({"size": size, "phase": label, "seconds": round(seconds, 4)})
+    print(f"  {label:<24} {seconds:8.3f} s", file=sys.__stderr__)
+    return value
+
+
+def benchmark_fleet(home: Path, size: int, jobs: int, results: list[dict]):
+    # Imported here: the module-level paths of doc-flesh are resolved against the fake HOME.
+    from doc_flesh.configtools.config_reader import CACHE_DIR, load_config
+    from doc_flesh.git_utils import check_all
+    from doc_flesh.sync_pipeline import run_sync_pipeline
+    from doc_flesh.sync_state import SyncState
+    from doc_flesh.target_file_writer import StaticManifest
+    from doc_flesh.uv_utils import update_uv_dependencies
+
+    print(f"Fleet of {size} repositories:", file=sys.stderr)
+    config_path = timed("create_fleet", lambda: create_fleet(home, size), results, size)
+
+    cache_dir = CACHE_DIR / f"fleet-{size}"
+    timed("load_config (no cache)", lambda: load_config(config_path), results, size)
+    timed("load_config (cold)", lambda: load_config(config_path, cache_dir), results, size)
+    repoconfigs = timed("load_config (warm)", lambda: load_config(config_path, cache_dir), results, size)
+
+    timed("check", lambda: check_all(repoconfigs, jobs=jobs, remote_ttl=0), results, size)
+
+    state = SyncState(cache_dir / "sync-state.json")
+
+    def sync():
+        results = run_sync_pipeline(repoconfigs, jobs=jobs, manifest=StaticManifest(), state=state)
+        state.save()
+        errors = [result.error for result in results if result.failed]
+        assert not errors, f"sync failed: {errors[:3]}"
+
+    timed("sync (cold)", sync, results, size)
+    timed("sync (warm)", sync, results, size)
+    timed("uv-upgrade (stubbed)", lambda: update_uv_dependencies(repoconfigs, jobs=jobs), results, size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--jobs", type=int, default=8)
+    parser.add_argument("--output", type=Path, default=Path("benchmark-results.json"))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="doc-flesh-bench-") as tmp:
+        home = Path(tmp)
+        os.environ["HOME"] = str(home)
+        os.environ.pop("GIT_CONFIG_GLOBAL", None)
+        os.environ["PATH"] = f"{home / 'bin'}{os.pathsep}{os.environ['PATH']}"
+        setup_home(home)
+
+        results: list[dict] = []
+        for size in args.sizes:
+            benchmark_fleet(home, size, args.jobs, results)
+
+    report = {
+        "doc_flesh_version": version("doc-flesh"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "jobs": args.jobs,
+        "results": results,
+    }
+    args.output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,86 @@
 import click
+import sys
 
-from doc_flesh.git_utils import add_to_staging, commit_and_push, check_all, add_uv_lock_to_staging
-from doc_flesh.configtools.config_reader import load_config, repo_local_paths_to_tmp
-from doc_flesh.configtools.siteinfo_generator import generate_and_write_siteinfo
-from doc_flesh.target_file_writer import apply_jinja_template, copy_static_files
-from doc_flesh.uv_utils import update_uv_dependencies
-from doc_flesh.models import RepoConfig
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+# Only lightweight modules are imported here. GitPython, Jinja2, pydantic, questionary etc. are
+# imported inside the commands that need them, so that e.g. `doc-flesh version`, `--help` and
+# shell completion start quickly.
+from doc_flesh.defaults import COMMIT_ENGINES, DEFAULT_DEBOUNCE, DEFAULT_POLL_INTERVAL, DEFAULT_REMOTE_TTL
+from doc_flesh.events import EMITTER, OUTPUT_FORMATS, emit
+from doc_flesh.timings import RECORDER
+
+if TYPE_CHECKING:
+    from doc_flesh.models import RepoConfig
 
 @click.group()
-def cli():
+@click.option(
+    "--timings", type=click.Path(dir_okay=False, path_type=Path),
+    help="Write per-repo, per-phase durations as JSON to this file.",
+)
+@click.option(
+    "--output", type=click.Choice(OUTPUT_FORMATS), default="text", show_default=True,
+    help="With jsonl, stdout gets one JSON event per outcome and the usual messages go to stderr.",
+)
+@click.pass_context
+def cli(ctx: click.Context, timings: Path | None, output: str):
     """CLI for doc_flesh."""
-    pass
+    if output == "jsonl":
+        EMITTER.configure("jsonl", sys.stdout)
+        ctx.with_resource(redirect_stdout(sys.stderr))
+
+    if timings:
+        RECORDER.enabled = True
+
+        def write_timings():
+            RECORDER.write_report(timings)
+            RECORDER.print_summary()
+            print(f"⏱️  Timings written to {timings}")
+
+        ctx.call_on_close(write_timings)
+
+jobs_option = click.option(
+    "--jobs", "-j", default=1, show_default=True, type=click.IntRange(min=1),
+    help="Number of repositories to process in parallel.",
+)
+
+no_cache_option = click.option(
+    "--no-cache", is_flag=True, help="Ignore the compiled config snapshot and read every file.",
+)
+
+remote_ttl_option = click.option(
+    "--remote-ttl", default=DEFAULT_REMOTE_TTL, show_default=True, type=click.FloatRange(min=0),
+    help="Seconds to trust a recently probed remote head. Use 0 to always ask the remote.",
+)
+
+def load_repoconfigs(no_cache: bool, only: set[Path] | None = None) -> list["RepoConfig"]:
+    """Load the configuration, using the compiled snapshot in the cache directory unless disabled."""
+    from doc_flesh.configtools.config_reader import CACHE_DIR, load_config
+
+    return load_config(cache_dir=None if no_cache else CACHE_DIR, only=only)
+
+def find_affected_repos(paths: tuple[Path, ...], no_cache: bool) -> list[Path]:
+    """List the repos affected by the given files. A missing feature or config file is reported
+    as an error instead of a traceback."""
+    from doc_flesh.configtools.config_reader import CACHE_DIR
+    from doc_flesh.configtools.reverse_index import affected_repos
 
-def run_all_checks(repoconfigs: list[RepoConfig]) -> bool:
+    try:
+        return affected_repos(list(paths), cache_dir=None if no_cache else CACHE_DIR)
+    except FileNotFoundError as e:
+        raise click.ClickException(str(e))
+
+def run_all_checks(
+    repoconfigs: list["RepoConfig"], jobs: int = 1, remote_ttl: float = DEFAULT_REMOTE_TTL
+) -> bool:
     """Check if all repos are safe to sync and have a valid siteinfo.json file.
     """
+    from doc_flesh.git_utils import check_all
+
     # Step 1: Check all repos for cleanliness.
-    all_safe = check_all(repoconfigs)
+    all_safe = check_all(repoconfigs, jobs=jobs, remote_ttl=remote_ttl)
     if not all_safe:
         raise click.Abort()
     
@@ -28,24 +92,91 @@ def version():
     print(f"doc-flesh is 0.1.2")
 
 @cli.command()
-def check():
+@jobs_option
+@no_cache_option
+@remote_ttl_option
+def check(jobs: int, no_cache: bool, remote_ttl: float):
     """Check if the local repotories are safe to sync. The dirtiness is defined in the README."""
 
     # Read the configuration file
-    repoconfigs = load_config()
-    run_all_checks(repoconfigs)
+    repoconfigs = load_repoconfigs(no_cache)
+    run_all_checks(repoconfigs, jobs=jobs, remote_ttl=remote_ttl)
 
     print()
     print("✅ All repos are clean and safe for automation.")
 
 @cli.command()
 @click.option("--dry-run", is_flag=True, help="Write in tempdir. Don't touch Git.")
+@click.option(
+    "--plan", is_flag=True,
+    help="Show the pending changes as diffs without writing anything. Exits with 2 if there are any.",
+)
+@click.option("--stat", is_flag=True, help="With --plan, show only the changed line counts per file.")
 @click.option("--no-commit", is_flag=True, help="Add files but don't commit.")
-def sync(dry_run: bool, no_commit: bool):
+@click.option("--force", is_flag=True, help="Sync also the repos whose inputs have not changed.")
+@click.option(
+    "--changed", multiple=True, type=click.Path(path_type=Path),
+    help="Sync only the repos affected by this template/static/feature file. Can be repeated.",
+)
+@click.option(
+    "--commit-engine", type=click.Choice(COMMIT_ENGINES), default="index", show_default=True,
+    help=(
+        "'plumbing' builds the commit from the changed files only, without rewriting the whole index. "
+        "It does not run the pre-commit and commit-msg hooks."
+    ),
+)
+@jobs_option
+@no_cache_option
+@remote_ttl_option
+@click.pass_context
+def sync(
+    ctx: click.Context,
+    dry_run: bool,
+    plan: bool,
+    stat: bool,
+    no_commit: bool,
+    force: bool,
+    changed: tuple[Path, ...],
+    commit_engine: str,
+    jobs: int,
+    no_cache: bool,
+    remote_ttl: float,
+):
     """Deploy the configured Jinja/Static files to production."""
+    from doc_flesh.configtools.config_reader import repo_local_paths_to_tmp
+    from doc_flesh.plan import print_plan
+    from doc_flesh.sync_pipeline import run_sync_pipeline
+    from doc_flesh.sync_state import SyncState
+    from doc_flesh.target_file_writer import StaticManifest
+
+    if stat and not plan:
+        raise click.UsageError("--stat can only be used with --plan.")
+    if plan and (dry_run or no_commit):
+        raise click.UsageError("--plan cannot be combined with --dry-run or --no-commit, it never writes anything.")
+
+    # Step 0: Limit the sync to the repos affected by the changed files, if given.
+    only = None
+    if changed:
+        only = set(find_affected_repos(changed, no_cache))
+        print(f"🎯 {len(only)} repos are affected by the changed files.")
+        if not only:
+            return
+
+    repoconfigs = load_repoconfigs(no_cache, only)
+
+    # Plan mode renders in memory and compares against the working trees. Nothing is written,
+    # so the repositories do not need to be checked.
+    if plan:
+        pending = print_plan(repoconfigs, jobs=jobs, stat=stat)
+        emit("finished", repos=len(repoconfigs), pending=pending)
+        if pending:
+            print(f"📋 {pending} files would change.")
+            ctx.exit(2)
+        print("✅ Nothing to sync.")
+        return
+
     # Step 1: Check if all repos are safe to sync and have a valid siteinfo.json file.
-    repoconfigs = load_config()
-    run_all_checks(repoconfigs)
+    run_all_checks(repoconfigs, jobs=jobs, remote_ttl=remote_ttl)
 
     # Step 2: Overwrite the local paths with temporary directories if dry-run is enabled.
     #        This is to prevent any accidental changes to the repositories.
@@ -53,39 +184,156 @@ def sync(dry_run: bool, no_commit: bool):
         repoconfigs = repo_local_paths_to_tmp(repoconfigs)
     
     # Step 3: Write the files based on JinjaFiles and StaticFiles and push to the remote.
-    #         If any step fails, we should abort immediately.
-    for repoconfig in repoconfigs:
+    #         A failing repository does not stop the others. Failures are summarized at the end.
+    #         Repos whose inputs have not changed since their last sync are skipped.
+    manifest = StaticManifest()
+    state = SyncState()
+    results = run_sync_pipeline(
+        repoconfigs, jobs=jobs, dry_run=dry_run, no_commit=no_commit, manifest=manifest, state=state,
+        commit_engine=commit_engine, force=force,
+    )
+    if not dry_run and not no_commit:
+        state.save()
+    print(manifest.summary())
+    skipped = sum(result.skipped for result in results)
+    if skipped:
+        print(f"⏭️  Skipped {skipped}/{len(results)} repos with unchanged inputs. Use --force to sync them anyway.")
+
+    failed = [result for result in results if result.failed]
+    emit("finished", repos=len(results), skipped=skipped, failed=len(failed))
+    if failed:
+        print()
+        print(f"❌ Sync failed in {len(failed)}/{len(results)} repositories:")
+        for result in failed:
+            print(f"   - {result.local_path}: {result.error}")
+        raise click.Abort()
 
-        apply_jinja_template(repoconfig)
-        copy_static_files(repoconfig)
-        
-        if not dry_run:
-            add_to_staging(repoconfig)
-            if not no_commit:
-                commit_and_push(repoconfig)
-    
     print("🎉 Sync complete.")
 
+@cli.command()
+@click.argument("paths", nargs=-1, required=True, type=click.Path(path_type=Path))
+@no_cache_option
+def affected(paths: tuple[Path, ...], no_cache: bool):
+    """List the repos affected by the given template, static or feature files.
+
+    Paths can be relative to the config directory, e.g. `templates/mkdocs.yml`.
+    """
+    for local_path in find_affected_repos(paths, no_cache):
+        print(local_path)
+
+@cli.command()
+@no_cache_option
+def discover(no_cache: bool):
+    """List the repos found under the DiscoveryRoots of config.yaml and their features."""
+    import yaml
+    from doc_flesh.configtools.config_reader import CACHE_DIR, CONFIG
+    from doc_flesh.configtools.discovery import discover_repos
+    from doc_flesh.models import ConfigEntries
+
+    config_entries = ConfigEntries(**yaml.safe_load(CONFIG.read_text()))
+    explicit = {entry.local_path.expanduser().resolve() for entry in config_entries.ManagedRepos}
+    for local_path, root in discover_repos(config_entries.DiscoveryRoots, None if no_cache else CACHE_DIR).items():
+        note = "  (overridden by ManagedRepos)" if local_path.resolve() in explicit else ""
+        print(f"{local_path}  [{', '.join(root.features)}]{note}")
+
+@cli.command()
+@click.argument("output_path", default="site-index.json", type=click.Path(dir_okay=False, path_type=Path))
+@jobs_option
+@no_cache_option
+def index(output_path: Path, jobs: int, no_cache: bool):
+    """Write the siteinfo.json of all managed repos, grouped by category, to one JSON file.
+    Default: site-index.json"""
+    from doc_flesh.configtools.config_reader import CACHE_DIR, CONFIG, read_config_entries
+    from doc_flesh.configtools.site_index import build_site_index, write_site_index
+
+    cache_dir = None if no_cache else CACHE_DIR
+    local_paths = [entry.local_path.expanduser() for entry in read_config_entries(CONFIG, cache_dir)]
+    document, errors = build_site_index(
+        local_paths, jobs=jobs, state_path=cache_dir / "site-index-state.json" if cache_dir else None
+    )
+
+    # A site with a broken siteinfo.json would silently vanish from the index, so nothing is written.
+    if errors:
+        for local_path, error in errors.items():
+            emit("failed", local_path, f"❌ {local_path}: {error}", phase="index", error=error)
+        raise click.Abort()
+
+    count = sum(len(sites) for sites in document["categories"].values())
+    if write_site_index(document, output_path):
+        print(f"✅ Wrote {count} sites to {output_path}.")
+    else:
+        print(f"✅ {output_path} is up to date ({count} sites).")
+
+@cli.command()
+@click.option("--stat", is_flag=True, help="Show only the changed line counts per file instead of diffs.")
+@click.option(
+    "--debounce", default=DEFAULT_DEBOUNCE, show_default=True, type=click.FloatRange(min=0),
+    help="Seconds to wait for more changes before rendering.",
+)
+@click.option("--poll", is_flag=True, help="Poll for changes instead of using inotify.")
+@click.option(
+    "--poll-interval", default=DEFAULT_POLL_INTERVAL, show_default=True, type=click.FloatRange(min=0.01),
+    help="Seconds between polls.",
+)
+@jobs_option
+def watch(stat: bool, debounce: float, poll: bool, poll_interval: float, jobs: int):
+    """Preview the pending changes of the affected repos whenever a template, static file,
+    feature or siteinfo.json changes. Nothing is written."""
+    from doc_flesh.watch import WatchSession, make_watcher
+
+    try:
+        session = WatchSession(jobs=jobs, stat=stat)
+    except FileNotFoundError as e:
+        raise click.ClickException(str(e))
+    watcher = make_watcher(poll, poll_interval)
+    try:
+        session.run(watcher, debounce)
+    except KeyboardInterrupt:
+        print()
+        print("👋 Stopped watching.")
+    finally:
+        watcher.close()
+
 @cli.command() # Add a positional parameter to specify the path.
 @click.argument("siteinfo_dir", default=".", type=click.Path(exists=True))
 def generate_siteinfo(siteinfo_dir: str):
     """Generate the siteinfo.json file to given path. Default: pwd"""
-    
+    from doc_flesh.configtools.siteinfo_generator import generate_and_write_siteinfo
+
     generate_and_write_siteinfo(siteinfo_dir)
 
 @cli.command()
-def uv_upgrade():
+@jobs_option
+@click.option("--fail-fast", is_flag=True, help="Stop starting new repos after the first failure.")
+@click.option(
+    "--uv-cache-dir", type=click.Path(file_okay=False, path_type=Path),
+    help="Cache directory shared by all uv processes. Default: uv's own cache directory.",
+)
+@click.option(
+    "--no-lock-reuse", is_flag=True,
+    help="Upgrade every repo separately instead of once per distinct dependency set.",
+)
+@no_cache_option
+@remote_ttl_option
+def uv_upgrade(
+    jobs: int, fail_fast: bool, uv_cache_dir: Path | None, no_lock_reuse: bool, no_cache: bool, remote_ttl: float
+):
     """Run `uv lock --upgrade` in all managed repositories."""
+    from doc_flesh.git_utils import add_uv_lock_to_staging, check_all, commit_and_push
+    from doc_flesh.uv_utils import update_uv_dependencies
+
     # Read the configuration file
-    repoconfigs = load_config()
+    repoconfigs = load_repoconfigs(no_cache)
 
     # Step 1: Check all repos for cleanliness.
-    all_safe = check_all(repoconfigs)
+    all_safe = check_all(repoconfigs, jobs=jobs, remote_ttl=remote_ttl)
     if not all_safe:
         raise click.Abort()
 
     # Step 2: Run `uv sync -upgrade` in each repository.
-    all_safe = update_uv_dependencies(repoconfigs)
+    all_safe = update_uv_dependencies(
+        repoconfigs, jobs=jobs, fail_fast=fail_fast, uv_cache_dir=uv_cache_dir, reuse_locks=not no_lock_reuse
+    )
     if not all_safe:
         raise click.Abort()
     print("✅ All uv.lock files are up to date.")
@@ -93,5 +341,5 @@ def uv_upgrade():
     # Step 3: Write the files based on JinjaFiles and StaticFiles and push to the remote.
     #         If any step fails, we should abort immediately.
     for repoconfig in repoconfigs:
-        add_uv_lock_to_staging(repoconfig)
-        commit_and_push(repoconfig)
\ No newline at end of file
+        staged = add_uv_lock_to_staging(repoconfig)
+        commit_and_push(repoconfig, staged)
\ No newline at end of file
@@ -0,0 +1,21 @@
+import os
+
+from pathlib import Path
+from pydantic import BaseModel
+
+
+def write_model(path: Path, model: BaseModel):
+    """Write a model as JSON atomically so that a concurrent run never reads a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_text(model.model_dump_json())
+    os.replace(tmp_path, path)
+
+
+def file_signature(path: Path) -> tuple[int, int] | None:
+    """Return (mtime_ns, size) of a file or None if it does not exist."""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
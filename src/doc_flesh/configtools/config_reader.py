@@ -3,15 +3,23 @@ import click
 
 from tempfile import TemporaryDirectory
 from pathlib import Path
-from doc_flesh.models import RepoConfig, SiteInfo, EmptySiteInfo, FeatureConfig, RepoConfigFlags, ConfigEntries, ConfigEntry
+from doc_flesh.models import RepoConfig, SiteInfo, EmptySiteInfo, ConfigEntries, ConfigEntry, ConfigSnapshot, SnapshotEntry
 from pydantic import ValidationError
+from doc_flesh.configtools.cache_files import file_signature, write_model
+from doc_flesh.configtools.feature_resolver import FeatureRegistry, FeatureResolver, mask_to_flags
+from doc_flesh.configtools.discovery import expand_config_entries
+from doc_flesh.timings import timed
 
 CONFIG = Path("~/.config/doc-flesh/config.yaml").expanduser()
+CACHE_DIR = Path("~/.cache/doc-flesh").expanduser()
 
-def validate_all_exists(config_entries: ConfigEntries) -> bool:
+# Bump this whenever the way a RepoConfig is built changes, so old snapshots are ignored.
+SNAPSHOT_VERSION = 3
+
+def validate_all_exists(entries: list[ConfigEntry]) -> bool:
     """Check if all local paths in the configuration exist."""
     all_exist = True
-    for entry in config_entries.ManagedRepos:
+    for entry in entries:
         if not entry.local_path.exists():
             print(f"❌ ERROR: Local path {entry.local_path} does not exist.")
             all_exist = False
@@ -32,84 +40,140 @@ def get_siteinfo(siteinfo_dir: Path) -> SiteInfo:
     return SiteInfo(**siteinfo_data)
 
 
-def load_feature_config(feature_name: str, yaml_path: Path) -> FeatureConfig:
-    """Load a feature configuration from a YAML file (e.g. ~/.config/doc-flesh/features/feature_name.yaml).
-    """
-    feature_path = yaml_path.parent / "features" / f"{feature_name}.yaml"
-    if not feature_path.exists():
-        raise FileNotFoundError(f"Feature configuration not found: {feature_path}")
-
-    feature_data = yaml.safe_load(feature_path.read_text())
-    return FeatureConfig(**feature_data)
+FEATURE_REGISTRY = FeatureRegistry()
+FEATURE_RESOLVER = FeatureResolver(FEATURE_REGISTRY)
 
 
 def convert_to_repo_config(entry: ConfigEntry, yaml_path: Path) -> RepoConfig:
     """Add a feature configuration and the siteinfo to the RepoConfig."""
-    
-    # Load the feature configuration
-    feature_configs:list[FeatureConfig] = []
-    for feature_name in entry.features:
-        try:
-            feature_config = load_feature_config(feature_name, yaml_path)
-            feature_configs.append(feature_config)
-        except FileNotFoundError as e:
-            print(f"❌ You are trying to use a feature that does not exist: {feature_name}")
-            raise e
-
-    # Combine all features into a single RepoConfig
-    combined_jinja_files = []
-    combined_static_files = []
-    combined_flags = RepoConfigFlags()
-
-    for feature in feature_configs:
-        combined_jinja_files.extend(feature.jinja_files)
-        combined_static_files.extend(feature.static_files)
-        
-        # Merge flags properly: combine individual flag values instead of replacing entire object
-        # Get current flag values as dict
-        current_flags = combined_flags.model_dump()
-        feature_flags = feature.flags.model_dump()
-        
-        # Merge individual flag values (OR operation for boolean flags)
-        for flag_name, flag_value in feature_flags.items():
-            if flag_value:  # Only set to True if the feature sets it to True
-                current_flags[flag_name] = True
-        
-        # Create new combined_flags object with merged values
-        combined_flags = RepoConfigFlags(**current_flags)
-
-    # Remove duplicates
-    combined_jinja_files = list(set(combined_jinja_files))
-    combined_static_files = list(set(combined_static_files))
+
+    # Combine all features (and the features they include) into a single RepoConfig
+    try:
+        resolved = FEATURE_RESOLVER.resolve(yaml_path.parent / "features", entry.features)
+    except FileNotFoundError as e:
+        print(f"❌ You are trying to use a feature that does not exist. {e}")
+        raise e
+    except ValueError as e:
+        print(f"❌ The includes of your features form a cycle. {e}")
+        raise e
 
     # Create the RepoConfig object
     return RepoConfig(
         local_path=entry.local_path,
-        jinja_files=combined_jinja_files,
-        static_files=combined_static_files,
-        flags=combined_flags,
+        jinja_files=list(resolved.jinja_files),
+        static_files=list(resolved.static_files),
+        flags=mask_to_flags(resolved.flags),
         siteinfo=get_siteinfo(entry.local_path),
     )
 
 
-def load_config(yaml_path: Path = CONFIG) -> list[RepoConfig]:
-    """Load the configuration from a YAML file into a Pydantic model."""
+def entry_input_paths(entry: ConfigEntry, yaml_path: Path) -> list[Path]:
+    """List all files that affect the RepoConfig built from this entry."""
+    try:
+        paths = list(FEATURE_RESOLVER.resolve(yaml_path.parent / "features", entry.features).sources)
+    except (FileNotFoundError, ValueError):
+        # Reported when the entry is converted
+        paths = [yaml_path.parent / "features" / f"{feature}.yaml" for feature in entry.features]
+    paths.append(entry.local_path / "siteinfo.json")
+    return paths
+
+
+def read_snapshot(snapshot_path: Path, yaml_path: Path) -> ConfigSnapshot | None:
+    """Read the compiled config snapshot if it exists and was built from this config file."""
+    try:
+        snapshot = ConfigSnapshot.model_validate_json(snapshot_path.read_bytes())
+    except (FileNotFoundError, ValueError):
+        return None
+
+    if snapshot.version != SNAPSHOT_VERSION or snapshot.config_path != yaml_path:
+        return None
+    return snapshot
+
+
+def read_config_entries(yaml_path: Path = CONFIG, cache_dir: Path | None = None) -> list[ConfigEntry]:
+    """Parse config.yaml and return its ManagedRepos followed by the discovered repositories."""
+    config_entries = ConfigEntries(**yaml.safe_load(yaml_path.read_text()))
+    return expand_config_entries(config_entries, cache_dir)
+
+
+@timed("load_config")
+def load_config(
+    yaml_path: Path = CONFIG, cache_dir: Path | None = None, only: set[Path] | None = None
+) -> list[RepoConfig]:
+    """Load the configuration from a YAML file into a Pydantic model.
+
+    If cache_dir is given, the fully resolved configuration is stored there as a snapshot.
+    On the next call only the entries whose input files (config.yaml, features/*.yaml and
+    siteinfo.json) have changed are rebuilt.
+
+    The repositories found under the DiscoveryRoots are loaded after the ManagedRepos.
+
+    If `only` is given, only the repositories with those local paths are loaded.
+    """
     # Check that it exists
     if not yaml_path.exists():
         raise FileNotFoundError(f"Config file not found: {yaml_path}")
 
-    # Load
-    config_data = yaml.safe_load(yaml_path.read_text())
-    config_entries = ConfigEntries(**config_data)
-    
-    if not validate_all_exists(config_entries):
+    snapshot_path = cache_dir / "config-snapshot.json" if cache_dir else None
+    snapshot = read_snapshot(snapshot_path, yaml_path) if snapshot_path else None
+    config_signature = file_signature(yaml_path)
+
+    # Load. The parsed config.yaml is reused from the snapshot if the file has not changed.
+    config_unchanged = snapshot is not None and tuple(snapshot.config_signature) == config_signature
+    if config_unchanged:
+        config_entries = snapshot.config
+    else:
+        config_data = yaml.safe_load(yaml_path.read_text())
+        config_entries = ConfigEntries(**config_data)
+
+    # Drop the compiled features whose files have changed since the previous load.
+    FEATURE_RESOLVER.refresh()
+
+    # Add the discovered repositories. Thanks to the discovery index, this is cheap for an unchanged tree.
+    entries = expand_config_entries(config_entries, cache_dir)
+    entries_unchanged = config_unchanged and [cached.entry for cached in snapshot.entries] == entries
+
+    if not validate_all_exists(entries):
         raise FileNotFoundError("One or more local paths do not exist. Read above.")
-    
+
+    cached_entries = {}
+    if snapshot:
+        cached_entries = {(cached.entry.local_path, tuple(cached.entry.features)): cached for cached in snapshot.entries}
+
     # Convert ConfigEntries objects to RepoConfig objects
     repo_configs = []
-    for entry in config_entries.ManagedRepos:
-        repo_config = convert_to_repo_config(entry, yaml_path)
+    snapshot_entries = []
+    rebuilt = 0
+    complete = True
+    for entry in entries:
+        cached = cached_entries.get((entry.local_path, tuple(entry.features)))
+
+        # Entries that are not requested are carried over to the snapshot as they are.
+        if only is not None and entry.local_path not in only:
+            if cached:
+                snapshot_entries.append(cached)
+            else:
+                complete = False
+            continue
+
+        inputs = {path: file_signature(path) for path in entry_input_paths(entry, yaml_path)}
+        if cached and cached.inputs == inputs:
+            repo_config = cached.repo_config
+        else:
+            repo_config = convert_to_repo_config(entry, yaml_path)
+            rebuilt += 1
+
         repo_configs.append(repo_config)
+        snapshot_entries.append(SnapshotEntry(entry=entry, inputs=inputs, repo_config=repo_config))
+
+    if snapshot_path and complete and (not entries_unchanged or rebuilt):
+        write_model(snapshot_path, ConfigSnapshot(
+            version=SNAPSHOT_VERSION,
+            config_path=yaml_path,
+            config_signature=config_signature,
+            config=config_entries,
+            entries=snapshot_entries,
+        ))
 
     return repo_configs
 
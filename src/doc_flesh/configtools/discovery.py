@@ -0,0 +1,105 @@
+import os
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from doc_flesh.configtools.cache_files import write_model
+from doc_flesh.models import ConfigEntries, ConfigEntry, DiscoveredDir, DiscoveryIndex, DiscoveryRoot
+from doc_flesh.timings import timed
+
+# Bump this whenever the layout of the index changes, so old indexes are ignored.
+DISCOVERY_VERSION = 1
+
+# Number of threads calling os.scandir at the same time.
+DISCOVERY_WORKERS = 8
+
+# Never descended into. Hidden directories (e.g. .git, .venv) are skipped as well.
+SKIP_DIRS = {"node_modules", "__pycache__"}
+
+
+def scan_dir(directory: Path, cached: DiscoveredDir | None) -> DiscoveredDir | None:
+    """Scan a single directory, or reuse the cached result if its mtime has not changed.
+
+    A directory is a repository if it has both a .git entry and a siteinfo.json file.
+    Returns None if the directory does not exist anymore.
+    """
+    try:
+        mtime_ns = directory.stat().st_mtime_ns
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    if cached is not None and cached.mtime_ns == mtime_ns:
+        return cached
+
+    names = set()
+    subdirs = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            names.add(entry.name)
+            if entry.is_dir(follow_symlinks=False) and not entry.name.startswith(".") and entry.name not in SKIP_DIRS:
+                subdirs.append(entry.name)
+
+    is_repo = ".git" in names and "siteinfo.json" in names
+    return DiscoveredDir(mtime_ns=mtime_ns, is_repo=is_repo, subdirs=[] if is_repo else sorted(subdirs))
+
+
+def read_discovery_index(index_path: Path | None) -> DiscoveryIndex:
+    if index_path is not None:
+        try:
+            index = DiscoveryIndex.model_validate_json(index_path.read_bytes())
+            if index.version == DISCOVERY_VERSION:
+                return index
+        except (FileNotFoundError, ValueError):
+            pass
+    return DiscoveryIndex(version=DISCOVERY_VERSION)
+
+
+@timed("discover")
+def discover_repos(roots: list[DiscoveryRoot], cache_dir: Path | None = None) -> dict[Path, DiscoveryRoot]:
+    """Find the repositories under the discovery roots. Returns {local_path: root} in a stable order.
+
+    The roots are scanned breadth-first, one directory level at a time, with the directories of a
+    level scanned in parallel. Repositories are not descended into. With a cache_dir, the result of
+    each directory is stored in discovery-index.json together with its mtime, so re-scanning an
+    unchanged tree only costs a stat() per directory.
+    """
+    index_path = cache_dir / "discovery-index.json" if cache_dir else None
+    old_index = read_discovery_index(index_path)
+    new_index = DiscoveryIndex(version=DISCOVERY_VERSION)
+
+    found: dict[Path, DiscoveryRoot] = {}
+    with ThreadPoolExecutor(max_workers=DISCOVERY_WORKERS) as executor:
+        for root in roots:
+            level = [root.path.expanduser()]
+            for depth in range(root.max_depth + 1):
+                results = executor.map(lambda directory: scan_dir(directory, old_index.dirs.get(directory)), level)
+                next_level = []
+                for directory, result in zip(level, results):
+                    if result is None:
+                        continue
+                    new_index.dirs[directory] = result
+                    if result.is_repo:
+                        found.setdefault(directory, root)
+                    elif depth < root.max_depth:
+                        next_level.extend(directory / name for name in result.subdirs)
+                level = next_level
+
+    if index_path is not None and new_index != old_index:
+        write_model(index_path, new_index)
+
+    return {local_path: found[local_path] for local_path in sorted(found)}
+
+
+def expand_config_entries(config_entries: ConfigEntries, cache_dir: Path | None = None) -> list[ConfigEntry]:
+    """Return the explicit ManagedRepos entries followed by the discovered repositories.
+
+    A discovered repository gets the features of its root, unless it is also listed in
+    ManagedRepos: then the explicit entry wins.
+    """
+    entries = list(config_entries.ManagedRepos)
+    if not config_entries.DiscoveryRoots:
+        return entries
+
+    explicit = {entry.local_path.expanduser().resolve() for entry in entries}
+    for local_path, root in discover_repos(config_entries.DiscoveryRoots, cache_dir).items():
+        if local_path.resolve() not in explicit:
+            entries.append(ConfigEntry(local_path=local_path, features=root.features))
+    return entries
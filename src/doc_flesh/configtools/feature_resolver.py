@@ -0,0 +1,158 @@
+import threading
+import yaml
+
+from pathlib import Path
+from typing import NamedTuple
+from doc_flesh.configtools.cache_files import file_signature
+from doc_flesh.models import FeatureConfig, RepoConfigFlags
+
+# Each flag of RepoConfigFlags is one bit of a compiled feature's flag mask.
+FLAG_BITS = {name: 1 << bit for bit, name in enumerate(RepoConfigFlags.model_fields)}
+
+
+def flags_to_mask(flags: RepoConfigFlags) -> int:
+    return sum(bit for name, bit in FLAG_BITS.items() if getattr(flags, name))
+
+
+def mask_to_flags(mask: int) -> RepoConfigFlags:
+    return RepoConfigFlags(**{name: bool(mask & bit) for name, bit in FLAG_BITS.items()})
+
+
+class FeatureRegistry:
+    """Load each feature definition (features/*.yaml) once and share it between all entries.
+
+    A cached feature is reused as long as the (mtime, size) of its file stays the same,
+    so long-running processes pick up edited features automatically.
+    """
+
+    def __init__(self):
+        self._features: dict[Path, tuple[tuple[int, int], FeatureConfig]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, feature_path: Path) -> FeatureConfig:
+        try:
+            stat = feature_path.stat()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Feature configuration not found: {feature_path}")
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            cached = self._features.get(feature_path)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+
+        feature_data = yaml.safe_load(feature_path.read_text())
+        feature_config = FeatureConfig(**feature_data)
+
+        with self._lock:
+            self._features[feature_path] = (signature, feature_config)
+        return feature_config
+
+    def clear(self):
+        with self._lock:
+            self._features.clear()
+
+
+class CompiledFeature(NamedTuple):
+    """A feature (or a combination of features) with its includes flattened.
+
+    The files are deduplicated and keep the order in which they were first listed.
+    `sources` are the feature files it was built from, in the same order.
+    """
+    jinja_files: tuple[Path, ...]
+    static_files: tuple[Path, ...]
+    flags: int
+    sources: tuple[Path, ...]
+
+
+def union(features: list[CompiledFeature]) -> CompiledFeature:
+    """Combine compiled features. The first occurrence of each path decides its position."""
+    flags = 0
+    for feature in features:
+        flags |= feature.flags
+    return CompiledFeature(
+        jinja_files=tuple(dict.fromkeys(path for feature in features for path in feature.jinja_files)),
+        static_files=tuple(dict.fromkeys(path for feature in features for path in feature.static_files)),
+        flags=flags,
+        sources=tuple(dict.fromkeys(path for feature in features for path in feature.sources)),
+    )
+
+
+class FeatureResolver:
+    """Resolve the feature list of a config entry into its files and flags.
+
+    Each feature file is compiled once: its includes are flattened, its paths are interned
+    and its flags become a bit mask. The result of each distinct feature list is memoized,
+    so repositories sharing the same features cost a single dict lookup.
+
+    The compiled features are not checked against their files on every lookup. Call refresh()
+    once before resolving a whole config to drop the features whose files have changed.
+    """
+
+    def __init__(self, registry: FeatureRegistry | None = None):
+        self.registry = registry or FeatureRegistry()
+        self._paths: dict[Path, Path] = {}
+        self._signatures: dict[Path, tuple[int, int] | None] = {}
+        self._compiled: dict[Path, CompiledFeature] = {}
+        self._resolved: dict[tuple[Path, tuple[str, ...]], CompiledFeature] = {}
+        self._lock = threading.RLock()
+
+    def intern(self, path: Path) -> Path:
+        return self._paths.setdefault(path, path)
+
+    def compile(self, feature_path: Path, including: tuple[Path, ...] = ()) -> CompiledFeature:
+        """Compile a feature file and, recursively, the features it includes (listed first)."""
+        with self._lock:
+            compiled = self._compiled.get(feature_path)
+            if compiled is not None:
+                return compiled
+
+            if feature_path in including:
+                cycle = " -> ".join(path.stem for path in (*including, feature_path))
+                raise ValueError(f"Features include each other: {cycle}")
+
+            self._signatures[feature_path] = file_signature(feature_path)
+            feature = self.registry.get(feature_path)
+            included = [
+                self.compile(feature_path.parent / f"{name}.yaml", (*including, feature_path))
+                for name in feature.includes
+            ]
+            own = CompiledFeature(
+                jinja_files=tuple(self.intern(path) for path in feature.jinja_files),
+                static_files=tuple(self.intern(path) for path in feature.static_files),
+                flags=flags_to_mask(feature.flags),
+                sources=(feature_path,),
+            )
+            compiled = union([*included, own])
+            self._compiled[feature_path] = compiled
+            return compiled
+
+    def resolve(self, features_dir: Path, feature_names: list[str]) -> CompiledFeature:
+        """Return the union of the named features (features_dir/NAME.yaml) in the given order."""
+        key = (features_dir, tuple(feature_names))
+        with self._lock:
+            resolved = self._resolved.get(key)
+            if resolved is None:
+                resolved = union([self.compile(features_dir / f"{name}.yaml") for name in feature_names])
+                self._resolved[key] = resolved
+            return resolved
+
+    def refresh(self):
+        """Forget the compiled features whose file, or the file of a feature they include, has changed."""
+        with self._lock:
+            changed = {path for path, signature in self._signatures.items() if file_signature(path) != signature}
+            if not changed:
+                return
+            for path in changed:
+                del self._signatures[path]
+            self._compiled = {
+                path: compiled for path, compiled in self._compiled.items() if changed.isdisjoint(compiled.sources)
+            }
+            self._resolved.clear()
+
+    def clear(self):
+        with self._lock:
+            self._signatures.clear()
+            self._compiled.clear()
+            self._resolved.clear()
+        self.registry.clear()
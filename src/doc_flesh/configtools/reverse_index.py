@@ -0,0 +1,140 @@
+import os
+
+from pathlib import Path
+from jinja2 import Environment, meta
+from doc_flesh.configtools.config_reader import (
+    CONFIG, FEATURE_RESOLVER, file_signature, read_config_entries, write_model
+)
+from doc_flesh.models import ConfigEntry, ReverseIndex
+from doc_flesh.target_file_writer import get_jinja_environment
+
+# Bump this whenever the layout of the index changes, so old indexes are ignored.
+INDEX_VERSION = 1
+
+
+def index_signature(yaml_path: Path) -> dict[str, tuple[int, int]]:
+    """The (mtime_ns, size) of config.yaml, every feature and every template.
+
+    Templates are included because one template may include another.
+    """
+    config_dir = yaml_path.parent
+    signature = {"config.yaml": file_signature(yaml_path)}
+    for subdir in ("features", "templates"):
+        for root, _, files in os.walk(config_dir / subdir):
+            for name in files:
+                path = Path(root) / name
+                signature[str(path.relative_to(config_dir))] = file_signature(path)
+    return signature
+
+
+def referenced_templates(environment: Environment, name: str, seen: set[str] | None = None) -> set[str]:
+    """Return the template and, recursively, every template it includes, imports or extends."""
+    seen = set() if seen is None else seen
+    if name in seen:
+        return seen
+    seen.add(name)
+
+    try:
+        source, _, _ = environment.loader.get_source(environment, name)
+    except Exception:
+        return seen
+
+    for child in meta.find_referenced_templates(environment.parse(source)):
+        if child:
+            referenced_templates(environment, child, seen)
+    return seen
+
+
+def build_reverse_index(
+    yaml_path: Path = CONFIG, entries: list[ConfigEntry] | None = None
+) -> dict[str, list[Path]]:
+    """Join config.yaml (and the discovered repositories) against the features, including the
+    features they include, to find which repositories use which file. Pass the entries if they
+    have already been read.
+
+    Raises FileNotFoundError if an entry uses a feature that does not exist.
+    """
+    if entries is None:
+        entries = read_config_entries(yaml_path)
+    # Only the sources are parsed, nothing is compiled, so the bytecode cache is not needed.
+    environment = get_jinja_environment(yaml_path.parent / "templates", bytecode_cache_dir=None)
+
+    FEATURE_RESOLVER.refresh()
+    paths: dict[str, list[Path]] = {"config.yaml": []}
+    for entry in entries:
+        used = {"config.yaml"}
+        try:
+            features = FEATURE_RESOLVER.resolve(yaml_path.parent / "features", entry.features)
+        except FileNotFoundError as e:
+            raise FileNotFoundError(f"{e} (used by {entry.local_path})") from e
+        used.update(f"features/{feature_path.name}" for feature_path in features.sources)
+        for jinjafile in features.jinja_files:
+            used.update(f"templates/{name}" for name in referenced_templates(environment, str(jinjafile)))
+        used.update(f"static/{static_file}" for static_file in features.static_files)
+
+        for key in used:
+            paths.setdefault(key, []).append(entry.local_path)
+
+    return paths
+
+
+def load_reverse_index(yaml_path: Path = CONFIG, cache_dir: Path | None = None) -> dict[str, list[Path]]:
+    """Load the reverse index from the cache directory, rebuilding it if any input has changed
+    or if the discovered repositories are not the same anymore.
+    """
+    signature = index_signature(yaml_path)
+    index_path = cache_dir / "reverse-index.json" if cache_dir else None
+    entries = read_config_entries(yaml_path, cache_dir)
+
+    if index_path:
+        try:
+            cached = ReverseIndex.model_validate_json(index_path.read_bytes())
+            if (
+                cached.version == INDEX_VERSION
+                and cached.signature == signature
+                and cached.paths.get("config.yaml") == [entry.local_path for entry in entries]
+            ):
+                return cached.paths
+        except (FileNotFoundError, ValueError):
+            pass
+
+    paths = build_reverse_index(yaml_path, entries)
+    if index_path:
+        write_model(index_path, ReverseIndex(version=INDEX_VERSION, signature=signature, paths=paths))
+    return paths
+
+
+def to_index_key(path: Path, config_dir: Path) -> str:
+    """Turn a path given by the user into a key of the reverse index.
+
+    Accepts paths relative to the config directory (e.g. `templates/mkdocs.yml`), absolute
+    paths and paths relative to the current directory.
+    """
+    resolved = path.expanduser().resolve()
+    if resolved.is_relative_to(config_dir.resolve()):
+        return str(resolved.relative_to(config_dir.resolve()))
+    return str(path)
+
+
+def repos_for_changes(index: dict[str, list[Path]], changed: list[Path], config_dir: Path) -> list[Path]:
+    """Look up the repositories (in config order) that use any of the changed files.
+
+    A changed siteinfo.json affects the repository it is in.
+    """
+    all_repos = index.get("config.yaml", [])
+
+    affected = set()
+    for path in changed:
+        if path.name == "siteinfo.json":
+            affected.update(repo for repo in all_repos if repo.resolve() == path.expanduser().resolve().parent)
+        else:
+            affected.update(index.get(to_index_key(path, config_dir), []))
+
+    return [repo for repo in all_repos if repo in affected]
+
+
+def affected_repos(
+    changed: list[Path], yaml_path: Path = CONFIG, cache_dir: Path | None = None
+) -> list[Path]:
+    """List the repositories (in config order) that are affected by changes to the given files."""
+    return repos_for_changes(load_reverse_index(yaml_path, cache_dir), changed, yaml_path.parent)
@@ -0,0 +1,89 @@
+import json
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from pydantic import ValidationError
+from doc_flesh.configtools.cache_files import write_model
+from doc_flesh.configtools.config_reader import file_signature
+from doc_flesh.models import SiteCategory, SiteIndexEntry, SiteIndexState, SiteInfo
+from doc_flesh.timings import timed
+
+# Bump this whenever the layout of the state changes, so old states are ignored.
+SITE_INDEX_VERSION = 1
+
+
+def read_site_index_state(state_path: Path | None) -> SiteIndexState:
+    if state_path is not None:
+        try:
+            state = SiteIndexState.model_validate_json(state_path.read_bytes())
+            if state.version == SITE_INDEX_VERSION:
+                return state
+        except (FileNotFoundError, ValueError):
+            pass
+    return SiteIndexState(version=SITE_INDEX_VERSION)
+
+
+def read_siteinfo_entry(local_path: Path, cached: SiteIndexEntry | None = None) -> SiteIndexEntry:
+    """Read and validate the siteinfo.json of a repository, unless its (mtime, size) has not changed."""
+    siteinfo_path = local_path / "siteinfo.json"
+    signature = file_signature(siteinfo_path)
+    if cached is not None and cached.signature == signature:
+        return cached
+
+    if signature is None:
+        return SiteIndexEntry(error="No siteinfo.json found")
+    try:
+        siteinfo = SiteInfo.model_validate_json(siteinfo_path.read_bytes())
+    except ValidationError as e:
+        return SiteIndexEntry(signature=signature, error=f"Invalid siteinfo.json: {e}")
+    return SiteIndexEntry(signature=signature, siteinfo=siteinfo)
+
+
+def group_by_category(siteinfos: list[SiteInfo]) -> dict:
+    """Build the index document: the sites of each category, sorted by name.
+
+    Every category is present (in the order of SiteCategory), even if it has no sites,
+    so the index site does not need to special-case missing keys.
+    """
+    categories: dict[str, list[dict]] = {category.value: [] for category in SiteCategory}
+    for siteinfo in sorted(siteinfos, key=lambda siteinfo: (siteinfo.site_name.lower(), siteinfo.site_name_slug)):
+        categories[siteinfo.category.value].append(siteinfo.model_dump(mode="json", exclude={"category"}))
+    return {"categories": categories}
+
+
+@timed("index")
+def build_site_index(
+    local_paths: list[Path], jobs: int = 1, state_path: Path | None = None
+) -> tuple[dict, dict[Path, str]]:
+    """Read the siteinfo.json of every repository and group the sites by category.
+
+    Up to `jobs` files are read at the same time. With a state_path, the parsed files are cached
+    there and only the files whose (mtime, size) has changed are read again.
+    Returns the index document and the errors by repository.
+    """
+    old_state = read_site_index_state(state_path)
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        entries = list(executor.map(
+            lambda local_path: read_siteinfo_entry(local_path, old_state.entries.get(local_path)), local_paths
+        ))
+
+    new_state = SiteIndexState(version=SITE_INDEX_VERSION, entries=dict(zip(local_paths, entries)))
+    if state_path is not None and new_state != old_state:
+        write_model(state_path, new_state)
+
+    errors = {local_path: entry.error for local_path, entry in zip(local_paths, entries) if entry.error}
+    document = group_by_category([entry.siteinfo for entry in entries if entry.siteinfo is not None])
+    return document, errors
+
+
+def write_site_index(document: dict, output_path: Path) -> bool:
+    """Write the index document. Returns False if the file already had exactly this content."""
+    content = json.dumps(document, indent=2, ensure_ascii=False) + "\n"
+    try:
+        if output_path.read_text() == content:
+            return False
+    except FileNotFoundError:
+        pass
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(content)
+    return True
@@ -0,0 +1,16 @@
+"""Defaults shared by the CLI options and the modules that implement them.
+
+This module must not import any third-party packages: the CLI reads these values while
+building its options, before it knows which command (and which dependencies) will run.
+"""
+
+# How long (in seconds) a probed remote head is trusted before asking the remote again.
+DEFAULT_REMOTE_TTL = 60
+
+# How the sync commits: "index" stages with `git add` and commits the whole index,
+# "plumbing" builds the commit from the managed files only (see git_utils.commit_files()).
+COMMIT_ENGINES = ("index", "plumbing")
+
+# Watch mode: seconds without new events before rendering, and the polling interval.
+DEFAULT_DEBOUNCE = 0.2
+DEFAULT_POLL_INTERVAL = 1.0
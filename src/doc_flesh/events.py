@@ -0,0 +1,62 @@
+import json
+import sys
+import threading
+import time
+
+from typing import TextIO
+
+OUTPUT_FORMATS = ("text", "jsonl")
+
+
+class EventEmitter:
+    """Report the outcome of each step (repo checked, file rendered, committed, ...) as an event.
+
+    In the default "text" mode an event only prints its human readable message, exactly like
+    the print() call it replaces. In "jsonl" mode each event is written as a single JSON line
+    to the stream given to configure(), while the human readable messages are not printed.
+    Writing a line takes a lock, so the events of parallel workers never interleave.
+    """
+
+    def __init__(self):
+        self.format = "text"
+        self._stream: TextIO | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def jsonl(self) -> bool:
+        return self.format == "jsonl"
+
+    def configure(self, format: str, stream: TextIO | None = None):
+        """Select the output format. JSON lines go to `stream` (default: the current stdout)."""
+        if format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format: {format}")
+        self.format = format
+        self._stream = stream if stream is not None else sys.stdout
+
+    def emit(self, event: str, repo: object = None, message: str | None = None, **fields):
+        """Emit a single event. `duration` (seconds) and any other fields must be JSON serializable,
+        paths are converted to strings.
+        """
+        if not self.jsonl:
+            if message is not None:
+                print(message)
+            return
+
+        record = {"ts": round(time.time(), 6), "event": event}
+        if repo is not None:
+            record["repo"] = str(repo)
+        if "duration" in fields:
+            fields["duration"] = round(fields["duration"], 6)
+        record.update(fields)
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            self._stream.write(line)
+            self._stream.flush()
+
+
+EMITTER = EventEmitter()
+
+
+def emit(event: str, repo: object = None, message: str | None = None, **fields):
+    """Emit an event using the process-wide emitter. See EventEmitter.emit()."""
+    EMITTER.emit(event, repo, message, **fields)
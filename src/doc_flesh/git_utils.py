@@ -1,33 +1,113 @@
+import json
+import subprocess
 import sys
+import time
 
+from functools import partial
+from pathlib import Path
 from git import Repo, GitCommandError
-from doc_flesh.models import RepoConfig
-
-def check_all(repoconfigs: list[RepoConfig]):
-    """Check if repositories are safe."""
-    all_safe = True
-    for repoconfig in repoconfigs:
-        print(f"Checking {repoconfig.local_path}...")
-
-        if not is_repo_safe(repoconfig):
-            print(f"Repository {repoconfig.local_path} is not safe.", file=sys.stderr)
-            all_safe = False
-    return all_safe
-
-def is_repo_up_to_date(repo: Repo):
-    """Check if a repo is up-to-date with the remote."""
-    print("🔄 Fetching updates from remote...")
-    origin = repo.remotes.origin
-    origin.fetch()
+from doc_flesh.defaults import DEFAULT_REMOTE_TTL
+from doc_flesh.events import emit
+from doc_flesh.models import RepoConfig, RepoStatus
+from doc_flesh.parallel_utils import run_buffered
+from doc_flesh.timings import span, timed
+
+# Stored in the .git directory next to FETCH_HEAD.
+REMOTE_STATE_FILE = "DOC_FLESH_REMOTE_HEAD"
+
+COMMIT_MESSAGE = "Auto-sync config files by doc-flesh"
+
+def check_one(repoconfig: RepoConfig, remote_ttl: float = DEFAULT_REMOTE_TTL) -> bool:
+    """Check if a single repository is safe and report it."""
+    print(f"Checking {repoconfig.local_path}...")
+
+    start = time.perf_counter()
+    safe = is_repo_safe(repoconfig, remote_ttl=remote_ttl)
+    emit("checked", repoconfig.local_path, safe=safe, duration=time.perf_counter() - start)
+    if not safe:
+        print(f"Repository {repoconfig.local_path} is not safe.", file=sys.stderr)
+        return False
+    return True
+
+def check_all(repoconfigs: list[RepoConfig], jobs: int = 1, remote_ttl: float = DEFAULT_REMOTE_TTL) -> bool:
+    """Check if repositories are safe.
+
+    Up to `jobs` repositories are checked at the same time. The output of each
+    check is buffered and printed in the config order.
+    """
+    results = run_buffered(partial(check_one, remote_ttl=remote_ttl), repoconfigs, jobs=jobs)
+    return all(results)
+
+def read_remote_head(repo: Repo, branch: str, ttl: float) -> str | None:
+    """Return the cached remote head of the branch if it was recorded less than ttl seconds ago."""
+    state_path = Path(repo.git_dir) / REMOTE_STATE_FILE
+    try:
+        state = json.loads(state_path.read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+
+    if state.get("branch") != branch or time.time() - state.get("checked_at", 0) > ttl:
+        return None
+    return state.get("sha")
+
+def record_remote_head(repo: Repo, branch: str, sha: str):
+    """Record the known head of the remote branch, e.g. after a probe or a push."""
+    state_path = Path(repo.git_dir) / REMOTE_STATE_FILE
+    state_path.write_text(json.dumps({"branch": branch, "sha": sha, "checked_at": time.time()}))
+
+def probe_remote_head(repo: Repo, branch: str, ttl: float = DEFAULT_REMOTE_TTL) -> str:
+    """Get the commit the remote branch points to without fetching any objects.
+
+    This asks the remote for the single ref only (`git ls-remote origin refs/heads/<branch>`).
+    The answer is cached for ttl seconds so that running check, sync and uv-upgrade back
+    to back does not query the remote each time.
+    """
+    cached = read_remote_head(repo, branch, ttl)
+    if cached is not None:
+        print("🔄 Using the recently probed remote head...")
+        return cached
+
+    print("🔄 Probing the remote head...")
+    with span("check.remote_probe"):
+        output = repo.git.ls_remote("origin", f"refs/heads/{branch}")
+    if not output:
+        raise ValueError(f"Remote has no branch '{branch}'")
+
+    sha = output.split()[0]
+    record_remote_head(repo, branch, sha)
+    return sha
+
+def is_repo_up_to_date(repo: Repo, ttl: float = DEFAULT_REMOTE_TTL, status: RepoStatus | None = None):
+    """Check if a repo is up-to-date with the remote.
+
+    A repository that is already ahead of or behind its last fetched upstream fails without
+    asking the remote. Otherwise a full fetch is done only if the remote head differs from
+    the local one.
+    """
+    if status is None:
+        status = get_repo_status(repo)
+
+    if status.ahead or status.behind:
+        print(
+            f"❌ ERROR: Local branch is {status.ahead} commit(s) ahead of and {status.behind} commit(s) "
+            f"behind {status.upstream}. Aborting."
+        )
+        return False
 
     # Get local and remote branch references
-    local_branch = repo.active_branch
-    remote_branch_name = f"origin/{local_branch.name}"
+    remote_branch_name = status.upstream or f"origin/{status.branch}"
 
     try:
         # Get commit hashes directly
-        local_commit = local_branch.commit.hexsha
-        remote_commit = repo.commit(remote_branch_name).hexsha
+        local_commit = status.head_sha or ""
+        remote_commit = probe_remote_head(repo, status.branch, ttl)
+
+        if local_commit != remote_commit:
+            print("🔄 Fetching updates from remote...")
+            with span("check.fetch"):
+                repo.remotes.origin.fetch()
+            remote_commit = repo.commit(remote_branch_name).hexsha
+            record_remote_head(repo, status.branch, remote_commit)
 
         if local_commit != remote_commit:
             print(
@@ -43,27 +123,59 @@ def is_repo_up_to_date(repo: Repo):
         return False
 
 
-def is_git_operation_in_progress(repoconfig: RepoConfig) -> bool:
-    """Check if a Git operation (rebase, merge, cherry-pick) is in progress."""
-    git_dir = repoconfig.local_path / ".git"
-    git_operations = {
-        "Rebase": ["rebase-merge", "rebase-apply"],
-        "Merge": ["MERGE_HEAD"],
-        "Cherry-pick": ["CHERRY_PICK_HEAD"],
-    }
-
-    for operation, files in git_operations.items():
-
-        if any((git_dir / file).exists() for file in files):
-            print(
-                f"❌ ERROR: Repository has a {operation.lower()} in progress. Aborting."
-            )
-            return True
+GIT_OPERATIONS = {
+    "Rebase": ["rebase-merge", "rebase-apply"],
+    "Merge": ["MERGE_HEAD"],
+    "Cherry-pick": ["CHERRY_PICK_HEAD"],
+}
+
+def git_operations_in_progress(git_dir: Path) -> list[str]:
+    """List the Git operations (rebase, merge, cherry-pick) that are in progress."""
+    return [
+        operation.lower()
+        for operation, files in GIT_OPERATIONS.items()
+        if any((git_dir / file).exists() for file in files)
+    ]
+
+
+def parse_porcelain_v2_status(output: str) -> RepoStatus:
+    """Parse the output of `git status --porcelain=v2 --branch`."""
+    status = RepoStatus()
+    for line in output.splitlines():
+        if line.startswith("# branch.oid "):
+            oid = line.split()[2]
+            status.head_sha = None if oid == "(initial)" else oid
+        elif line.startswith("# branch.head "):
+            head = line.split(maxsplit=2)[2]
+            status.branch = None if head == "(detached)" else head
+        elif line.startswith("# branch.upstream "):
+            status.upstream = line.split(maxsplit=2)[2]
+        elif line.startswith("# branch.ab "):
+            ahead, behind = line.split()[2:4]
+            status.ahead, status.behind = int(ahead), -int(behind)
+        elif line[:2] in ("1 ", "2 ", "u "):
+            status.dirty = True
+    return status
+
+
+def get_repo_status(repo: Repo) -> RepoStatus:
+    """Gather branch, detached, dirty, ahead/behind and in-progress state of a repository.
+
+    Everything except the in-progress operations comes from a single
+    `git status --porcelain=v2 --branch` call. Untracked files do not make a repository dirty.
+    """
+    if repo.bare:
+        return RepoStatus(bare=True)
 
-    return False
+    with span("check.status"):
+        output = repo.git.status("--porcelain=v2", "--branch", "--untracked-files=no")
+    status = parse_porcelain_v2_status(output)
+    status.in_progress = git_operations_in_progress(Path(repo.git_dir))
+    return status
 
 
-def is_repo_safe(repoconfig: RepoConfig):
+@timed("check")
+def is_repo_safe(repoconfig: RepoConfig, remote_ttl: float = DEFAULT_REMOTE_TTL):
     """Check if a repo is safe for automated commits using GitPython."""
     print()
     print(f"🔍 Checking repo: {repoconfig.local_path}")
@@ -73,30 +185,33 @@ def is_repo_safe(repoconfig: RepoConfig):
         return False
 
     repo = Repo(repoconfig.local_path)
+    status = get_repo_status(repo)
 
-    if repo.head.is_detached:
+    if status.bare:
+        print("❌ ERROR: Repository is bare. Aborting.", file=sys.stderr)
+        return False
+
+    if status.detached:
         print(
             "❌ ERROR: Repository is in detached HEAD state. Aborting.", file=sys.stderr
         )
         return False
 
-    if repo.active_branch.name != "main":
+    if status.branch != "main":
         print("❌ ERROR: Not on the 'main' branch. Aborting.", file=sys.stderr)
         return False
 
-    if repo.bare:
-        print("❌ ERROR: Repository is bare. Aborting.", file=sys.stderr)
-        return False
-
-    if repo.is_dirty():
+    if status.dirty:
         print("❌ ERROR: Repository is dirty. Aborting.", file=sys.stderr)
         return False
 
-    if is_git_operation_in_progress(repoconfig):
+    for operation in status.in_progress:
+        print(f"❌ ERROR: Repository has a {operation} in progress. Aborting.")
+    if status.in_progress:
         print("❌ ERROR: Git operation in progress. Aborting.", file=sys.stderr)
         return False
 
-    if not is_repo_up_to_date(repo):
+    if not is_repo_up_to_date(repo, remote_ttl, status):
         return False
 
     print("✅ Repo is clean and safe for automation.", file=sys.stderr)
@@ -108,51 +223,212 @@ def list_repoconfig_files(repoconfig: RepoConfig):
     files += [str(repoconfig.local_path / file) for file in repoconfig.static_files]
     return files
 
-def add_to_staging(repoconfig: RepoConfig):
-    """Add files to the staging area using GitPython."""
-    try:
-        repo = Repo(repoconfig.local_path)
-
-        # Get the list of files to commit
+def staged_paths(repo: Repo) -> list[str]:
+    """List the paths whose staged content differs from HEAD (`git diff --cached --name-only`)."""
+    output = repo.git.diff("--cached", "--name-only", "-z", "HEAD")
+    return [path for path in output.split("\0") if path]
+
+def parse_porcelain_v2_paths(output: str) -> list[Path]:
+    """Parse the paths of `git status --porcelain=v2 -z` (changed, renamed, unmerged, untracked and ignored)."""
+    paths = []
+    entries = iter(output.split("\0"))
+    for entry in entries:
+        if entry.startswith("1 "):
+            paths.append(Path(entry.split(" ", 8)[8]))
+        elif entry.startswith("2 "):
+            paths.append(Path(entry.split(" ", 9)[9]))
+            next(entries, None)  # The original path of the rename
+        elif entry.startswith("u "):
+            paths.append(Path(entry.split(" ", 10)[10]))
+        elif entry.startswith(("? ", "! ")):
+            paths.append(Path(entry[2:]))
+    return paths
+
+@timed("stage")
+def uncommitted_files(repoconfig: RepoConfig) -> list[Path]:
+    """List the managed files whose content in the working tree or the index differs from HEAD.
+
+    This includes managed files that are not tracked yet, even if the repository's .gitignore
+    matches them, e.g. after an interrupted sync or a reset index. One `git status` call is used.
+    """
+    files = [*repoconfig.jinja_files, *repoconfig.static_files]
+    if not files:
+        return []
+    repo = Repo(repoconfig.local_path)
+    output = repo.git.status(
+        "--porcelain=v2", "-z", "--untracked-files=all", "--ignored=traditional",
+        "--", *(Path(file).as_posix() for file in files),
+    )
+    return parse_porcelain_v2_paths(output)
+
+@timed("stage")
+def add_to_staging(repoconfig: RepoConfig, changed_files: list[Path] | None = None) -> list[str]:
+    """Add files to the staging area. Returns the staged paths that differ from HEAD.
+
+    If changed_files (relative to the repository) is given, only those are staged. Otherwise
+    every managed file is. With no files to stage, the index is not touched at all.
+    """
+    start = time.perf_counter()
+
+    # Get the list of files to commit.
+    if changed_files is None:
         files = list_repoconfig_files(repoconfig)
-        repo.index.add(files)
-        
-        # Count how many were actually added
-        added_files = len(repo.index.diff("HEAD"))
-        print(f"✅ Added {added_files}/{len(files)} files to staging area (the rest have no changes).")
-    except GitCommandError as e:
-        print(f"❌ ERROR: Git command error: {e}", file=sys.stderr)
+    else:
+        files = [str(repoconfig.local_path / file) for file in changed_files]
+    if not files:
+        return []
+
+    # Note: `git add` is used instead of repo.index.add(), because GitPython changes the working
+    # directory of the whole process while adding, which is not safe when several repositories
+    # are synced in parallel. Like repo.index.add(), managed files are staged even if the
+    # repository's .gitignore matches them.
+    repo = Repo(repoconfig.local_path)
+    repo.git.add("-f", "--", *files)
+
+    # Count how many were actually added
+    staged = staged_paths(repo)
+    emit(
+        "staged", repoconfig.local_path,
+        message=f"✅ Added {len(staged)}/{len(files)} files to staging area (the rest have no changes).",
+        files=len(staged), duration=time.perf_counter() - start,
+    )
+    return staged
+
+@timed("stage")
+def add_uv_lock_to_staging(repo_config: RepoConfig) -> list[str]:
+    """Add the uv.lock file to the staging area. Returns the staged paths that differ from HEAD."""
+    start = time.perf_counter()
+    repo = Repo(repo_config.local_path)
 
-def add_uv_lock_to_staging(repo_config: RepoConfig):
-    """Add the uv.lock file to the staging area."""
+    repo.git.add("-f", "--", str(repo_config.local_path / "uv.lock"))
+    staged = staged_paths(repo)
+    if staged:
+        emit(
+            "staged", repo_config.local_path, message="✅ Added uv.lock file to staging area.",
+            files=len(staged), duration=time.perf_counter() - start,
+        )
+    return staged
 
+@timed("commit")
+def commit_changes(repo_config: RepoConfig, staged: list[str] | None = None) -> bool:
+    """Commit the staged changes. Returns True if a commit was created.
+
+    Pass the paths returned by the staging step as `staged` to avoid diffing the index again.
+    """
+    start = time.perf_counter()
     repo = Repo(repo_config.local_path)
+    if staged is None:
+        staged = staged_paths(repo)
+
+    # We should not commit if there are no staged files.
+    if not staged:
+        print(f"🚫 No changes to commit for {repo_config.local_path}")
+        return False
 
-    repo.index.add([repo_config.local_path / "uv.lock"])
-    added_files = len(repo.index.diff("HEAD"))
-    if added_files:
-        print(f"✅ Added uv.lock file to staging area.")
+    # Commit the changes
+    commit = repo.index.commit(COMMIT_MESSAGE)
+    emit(
+        "committed", repo_config.local_path, message=f"📝 Committed changes with message: '{COMMIT_MESSAGE}'",
+        sha=commit.hexsha, duration=time.perf_counter() - start,
+    )
+    return True
+
+def file_mode(path: Path) -> str:
+    """The Git file mode of a regular file in the working tree."""
+    return "100755" if path.stat().st_mode & 0o111 else "100644"
+
+def build_tree(repo: Repo, tree_sha: str | None, blobs: dict[str, tuple[str, str]]) -> str:
+    """Write a new tree that is `tree_sha` with the given blobs replaced or added.
+
+    The keys of `blobs` are paths relative to this tree and the values are (mode, sha).
+    Only the trees on the path of a changed file are read and written, everything else
+    is shared with the old tree.
+    """
+    entries: dict[str, str] = {}
+    if tree_sha:
+        for line in repo.git.ls_tree("-z", tree_sha).split("\0"):
+            if line:
+                info, name = line.split("\t", 1)
+                entries[name] = info
+
+    subtrees: dict[str, dict[str, tuple[str, str]]] = {}
+    for path, (mode, sha) in blobs.items():
+        name, _, rest = path.partition("/")
+        if rest:
+            subtrees.setdefault(name, {})[rest] = (mode, sha)
+        else:
+            entries[name] = f"{mode} blob {sha}"
+
+    for name, sub_blobs in subtrees.items():
+        old = entries.get(name, "").split()
+        old_sha = old[2] if len(old) == 3 and old[1] == "tree" else None
+        entries[name] = f"040000 tree {build_tree(repo, old_sha, sub_blobs)}"
+
+    mktree_input = "".join(f"{info}\t{name}\0" for name, info in entries.items())
+    process = subprocess.run(
+        ["git", "mktree", "-z"], cwd=repo.working_dir, input=mktree_input.encode(), capture_output=True, check=True
+    )
+    return process.stdout.decode().strip()
+
+@timed("commit")
+def commit_files(repo_config: RepoConfig, changed_files: list[Path]) -> bool:
+    """Commit the changed files without staging them first. Returns True if a commit was created.
+
+    Works like `hash-object -w` + `mktree` + `commit-tree` + `update-ref`: the new tree is HEAD's
+    tree with the blobs of the changed files swapped in, so the cost depends on the number of
+    changed files, not on the size of the repository. Afterwards only the index entries of those
+    files are refreshed.
+
+    Unlike commit_changes (repo.index.commit), no hooks run: a repository with a pre-commit or
+    commit-msg hook may get a different commit than with the index engine.
+    """
+    start = time.perf_counter()
+    if not changed_files:
+        return False
 
-def commit_and_push(repo_config: RepoConfig):
+    repo = Repo(repo_config.local_path)
+    paths = [Path(file).as_posix() for file in changed_files]
+    shas = repo.git.hash_object("-w", "--", *paths).split()
+    blobs = {
+        path: (file_mode(repo_config.local_path / path), sha) for path, sha in zip(paths, shas)
+    }
+
+    head = repo.head.commit
+    tree = build_tree(repo, head.tree.hexsha, blobs)
+    if tree == head.tree.hexsha:
+        print(f"🚫 No changes to commit for {repo_config.local_path}")
+        return False
+
+    commit_sha = repo.git.commit_tree(tree, "-p", head.hexsha, "-m", COMMIT_MESSAGE)
+    repo.git.update_ref("-m", f"commit: {COMMIT_MESSAGE}", repo.head.ref.path, commit_sha, head.hexsha)
+    repo.git.update_index("--add", "--", *paths)
+
+    emit(
+        "committed", repo_config.local_path, message=f"📝 Committed changes with message: '{COMMIT_MESSAGE}'",
+        sha=commit_sha, engine="plumbing", duration=time.perf_counter() - start,
+    )
+    return True
+
+@timed("push")
+def push_changes(repo_config: RepoConfig):
+    """Push the local main branch to the remote repository."""
+    start = time.perf_counter()
+    repo = Repo(repo_config.local_path)
+
+    print("🚀 Pushing changes to remote...")
+    origin = repo.remotes.origin
+    origin.push().raise_if_error()
+    record_remote_head(repo, repo.active_branch.name, repo.head.commit.hexsha)
+    emit(
+        "pushed", repo_config.local_path, message=f"✅ Successfully pushed changes to {origin.url}.",
+        remote=origin.url, duration=time.perf_counter() - start,
+    )
+
+def commit_and_push(repo_config: RepoConfig, staged: list[str] | None = None):
     """Commit and push changes in a repo using GitPython."""
     try:
-        repo = Repo(repo_config.local_path)
-
-        # We should not commit if there are no staged files.
-        if not repo.index.diff("HEAD"):
-            print(f"🚫 No changes to commit for {repo_config.local_path}")
-            return
-
-        # Commit the changes
-        commit_msg = "Auto-sync config files by doc-flesh"
-        print(f"📝 Committing changes with message: '{commit_msg}'")
-        repo.index.commit(commit_msg)
-
-        # Push the changes to the remote repository
-        print("🚀 Pushing changes to remote...")
-        origin = repo.remotes.origin
-        origin.push()
-        print(f"✅ Successfully pushed changes to {origin.url}.")
+        if commit_changes(repo_config, staged):
+            push_changes(repo_config)
     except GitCommandError as e:
         print(f"❌ ERROR: Git command error: {e}", file=sys.stderr)
-
+        emit("failed", repo_config.local_path, phase="git", error=str(e))
@@ -8,6 +8,17 @@ from doc_flesh.models.models import (
     RepoConfigFlags,
     ConfigEntries,
     ConfigEntry,
+    DiscoveryRoot,
+    DiscoveredDir,
+    DiscoveryIndex,
+    SiteIndexEntry,
+    SiteIndexState,
+    SyncResult,
+    FileChange,
+    RepoStatus,
+    ReverseIndex,
+    SnapshotEntry,
+    ConfigSnapshot,
 )
 
 __all__ = [
@@ -20,4 +31,15 @@ __all__ = [
     "RepoConfigFlags",
     "ConfigEntries",
     "ConfigEntry",
+    "DiscoveryRoot",
+    "DiscoveredDir",
+    "DiscoveryIndex",
+    "SiteIndexEntry",
+    "SiteIndexState",
+    "SyncResult",
+    "FileChange",
+    "RepoStatus",
+    "ReverseIndex",
+    "SnapshotEntry",
+    "ConfigSnapshot",
 ]
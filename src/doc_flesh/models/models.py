@@ -1,7 +1,7 @@
 import re
 
 from pydantic import BaseModel, field_validator, Field
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 from enum import Enum
 
@@ -79,6 +79,7 @@ class FeatureConfig(BaseModel):
     jinja_files: List[Path] = Field(default_factory=list)
     static_files: List[Path] = Field(default_factory=list)
     flags: RepoConfigFlags = Field(default_factory=RepoConfigFlags)
+    includes: List[str] = Field(default_factory=list)  # Other features whose files and flags come first
 
 class ConfigEntry(BaseModel):
     """Each entry in the config.yml file. Features are activated by adding them here.
@@ -86,10 +87,103 @@ class ConfigEntry(BaseModel):
     local_path: Path
     features: List[str] = Field(default_factory=list)
 
+class DiscoveryRoot(BaseModel):
+    """A directory in the config.yml file that is scanned for managed repositories,
+    i.e. Git repositories with a siteinfo.json file.
+    """
+    path: Path
+    max_depth: int = 3  # How many directory levels below the path are scanned
+    features: List[str] = Field(default_factory=lambda: ["default"])  # For every repo found here
+
 class ConfigEntries(BaseModel):
     """All entries in the config.yml file. This is the main entry point for doc-flesh.
+
+    The repositories found under the DiscoveryRoots are managed as well. An explicit
+    ManagedRepos entry for the same path overrides the features of its root.
     """
     ManagedRepos: List[ConfigEntry] = Field(default_factory=list)
+    DiscoveryRoots: List[DiscoveryRoot] = Field(default_factory=list)
+
+class SnapshotEntry(BaseModel):
+    """A fully resolved RepoConfig and the (mtime_ns, size) of every file it was built from.
+    A missing input file is recorded as None.
+    """
+    entry: ConfigEntry
+    inputs: Dict[Path, Optional[Tuple[int, int]]]
+    repo_config: RepoConfig
+
+class ConfigSnapshot(BaseModel):
+    """The compiled form of config.yaml that is stored in the cache directory."""
+    version: int
+    config_path: Path
+    config_signature: Tuple[int, int]
+    config: ConfigEntries  # The parsed config.yaml, before discovery
+    entries: List[SnapshotEntry] = Field(default_factory=list)
+
+class SiteIndexEntry(BaseModel):
+    """The siteinfo.json of a repository as read by `doc-flesh index`, with the (mtime_ns, size)
+    of the file when it was read. A missing or invalid file has an error instead of a siteinfo.
+    """
+    signature: Optional[Tuple[int, int]] = None
+    siteinfo: Optional[SiteInfo] = None
+    error: str = ""
+
+class SiteIndexState(BaseModel):
+    """The siteinfo.json files read by the last `doc-flesh index`. Stored in the cache directory."""
+    version: int
+    entries: Dict[Path, SiteIndexEntry] = Field(default_factory=dict)
+
+class DiscoveredDir(BaseModel):
+    """The scan result of a single directory. Valid as long as the mtime of the directory is the same."""
+    mtime_ns: int
+    is_repo: bool = False
+    subdirs: List[str] = Field(default_factory=list)
+
+class DiscoveryIndex(BaseModel):
+    """The scan results of the discovery roots that are stored in the cache directory."""
+    version: int
+    dirs: Dict[Path, DiscoveredDir] = Field(default_factory=dict)
+
+class ReverseIndex(BaseModel):
+    """Maps each template, static file and feature (relative to the config directory)
+    to the repositories that use it. Stored in the cache directory.
+    """
+    version: int
+    signature: Dict[str, Tuple[int, int]]
+    paths: Dict[str, List[Path]] = Field(default_factory=dict)
+
+class RepoStatus(BaseModel):
+    """The state of a local repository, gathered in a single `git status` call."""
+    branch: Optional[str] = None  # None when HEAD is detached
+    head_sha: Optional[str] = None  # None in a repository without commits
+    upstream: Optional[str] = None
+    ahead: int = 0
+    behind: int = 0
+    bare: bool = False
+    dirty: bool = False
+    in_progress: List[str] = Field(default_factory=list)  # e.g. ["rebase", "merge"]
+
+    @property
+    def detached(self) -> bool:
+        return self.branch is None
+
+class SyncResult(BaseModel):
+    """The outcome of syncing a single repository. Failures are collected instead of raised."""
+    local_path: Path
+    skipped: bool = False  # Inputs unchanged since the last successful sync
+    committed: bool = False
+    pushed: bool = False
+    error: str = ""
+
+    @property
+    def failed(self) -> bool:
+        return bool(self.error)
+
+class FileChange(BaseModel):
+    """A managed file whose rendered content differs from the working tree. Used by `sync --plan`."""
+    path: Path  # Relative to the repository
+    old: Optional[bytes] = None  # None if the file does not exist yet
+    new: bytes
 
 class JinjaVariables(BaseModel):
     """Model for Jinja template variables."""
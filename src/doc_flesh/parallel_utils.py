@@ -0,0 +1,102 @@
+import io
+import sys
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Iterable, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class _ThreadLocalStream(io.TextIOBase):
+    """A stand-in for sys.stdout/sys.stderr that redirects writes of worker threads.
+
+    Threads that have registered a buffer write into it. Everyone else (e.g. the main
+    thread) writes straight to the original stream.
+    """
+
+    def __init__(self, fallback, local: threading.local, name: str):
+        self._fallback = fallback
+        self._local = local
+        self._name = name
+
+    def write(self, text: str) -> int:
+        chunks = getattr(self._local, "chunks", None)
+        if chunks is None:
+            return self._fallback.write(text)
+        chunks.append((self._name, text))
+        return len(text)
+
+    def flush(self):
+        if getattr(self._local, "chunks", None) is None:
+            self._fallback.flush()
+
+
+@contextmanager
+def buffered_std_streams():
+    """Swap sys.stdout and sys.stderr to thread-aware proxies for the duration of the block."""
+    local = threading.local()
+    original_stdout, original_stderr = sys.stdout, sys.stderr
+    sys.stdout = _ThreadLocalStream(original_stdout, local, "stdout")
+    sys.stderr = _ThreadLocalStream(original_stderr, local, "stderr")
+    try:
+        yield local
+    finally:
+        sys.stdout, sys.stderr = original_stdout, original_stderr
+
+
+@contextmanager
+def buffering_into(local: threading.local, chunks: list[tuple[str, str]]):
+    """Collect everything the current thread prints into `chunks`.
+
+    The `local` object is the one yielded by buffered_std_streams().
+    """
+    local.chunks = chunks
+    try:
+        yield chunks
+    finally:
+        local.chunks = None
+
+
+def replay(chunks: list[tuple[str, str]]):
+    """Write the buffered output of one task to the real streams, keeping the original order."""
+    for stream_name, text in chunks:
+        stream = sys.stdout if stream_name == "stdout" else sys.stderr
+        stream.write(text)
+    sys.stdout.flush()
+
+
+def run_buffered(func: Callable[[T], R], items: Iterable[T], jobs: int = 1) -> list[R]:
+    """Run func for each item using a pool of `jobs` worker threads.
+
+    Anything the workers print is buffered per item and printed in the order of `items`
+    as soon as all the preceding items have finished. Results are returned in the same order.
+    With jobs=1 the items are processed sequentially and printed directly.
+    """
+    items = list(items)
+    if jobs <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+
+    with buffered_std_streams() as local:
+
+        def worker(item: T):
+            with buffering_into(local, []) as chunks:
+                try:
+                    return func(item), None, chunks
+                except Exception as e:
+                    return None, e, chunks
+
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(worker, item) for item in items]
+
+            results = []
+            for future in futures:
+                result, error, chunks = future.result()
+                replay(chunks)
+                if error is not None:
+                    raise error
+                results.append(result)
+
+    return results
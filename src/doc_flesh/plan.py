@@ -0,0 +1,135 @@
+import difflib
+
+from functools import partial
+from pathlib import Path
+from jinja2 import Environment
+from doc_flesh.events import emit
+from doc_flesh.models import FileChange, RepoConfig
+from doc_flesh.models.transformations import transform_to_jinja_variables
+from doc_flesh.parallel_utils import run_buffered
+from doc_flesh.target_file_writer import StaticManifest, get_jinja_environment
+
+
+def read_if_exists(path: Path) -> bytes | None:
+    try:
+        return path.read_bytes()
+    except FileNotFoundError:
+        return None
+
+
+def plan_jinja_files(repoconfig: RepoConfig, environment: Environment | None = None) -> list[FileChange]:
+    """Render the Jinja files of a repository in memory and compare them against the working tree."""
+    environment = environment or get_jinja_environment()
+    jinja_variables = transform_to_jinja_variables(repoconfig).model_dump()
+
+    changes = []
+    for jinjafile in repoconfig.jinja_files:
+        new = environment.get_template(str(jinjafile)).render(jinja_variables).encode()
+        old = read_if_exists(Path(repoconfig.local_path) / jinjafile)
+        if old != new:
+            changes.append(FileChange(path=Path(jinjafile), old=old, new=new))
+    return changes
+
+
+def plan_static_files(repoconfig: RepoConfig, manifest: StaticManifest) -> list[FileChange]:
+    """Compare the static files of a repository against their sources."""
+    changes = []
+    for static_file in repoconfig.static_files:
+        static_file = Path(static_file)
+        dst = Path(repoconfig.local_path) / static_file
+        if manifest.is_up_to_date(static_file, dst, align_mtime=False):
+            continue
+        new = (manifest.base_dir / static_file).read_bytes()
+        old = read_if_exists(dst)
+        if old != new:
+            changes.append(FileChange(path=static_file, old=old, new=new))
+    return changes
+
+
+def plan_repo(
+    repoconfig: RepoConfig, manifest: StaticManifest, environment: Environment | None = None
+) -> list[FileChange]:
+    """List the managed files of a repository that a sync would change. Nothing is written."""
+    return plan_jinja_files(repoconfig, environment) + plan_static_files(repoconfig, manifest)
+
+
+def decode_lines(content: bytes | None) -> list[str] | None:
+    """Split the content into lines for difflib. Returns None for binary content."""
+    if content is None:
+        return []
+    try:
+        return content.decode().splitlines(keepends=True)
+    except UnicodeDecodeError:
+        return None
+
+
+def count_changed_lines(change: FileChange) -> tuple[int, int]:
+    """Return the number of (added, removed) lines."""
+    old, new = decode_lines(change.old), decode_lines(change.new)
+    if old is None or new is None:
+        return 0, 0
+    added = removed = 0
+    for line in difflib.unified_diff(old, new, n=0):
+        if line.startswith("+") and not line.startswith("+++"):
+            added += 1
+        elif line.startswith("-") and not line.startswith("---"):
+            removed += 1
+    return added, removed
+
+
+def format_diff(change: FileChange) -> str:
+    """Format the change as a unified diff, like `git diff`."""
+    old, new = decode_lines(change.old), decode_lines(change.new)
+    fromfile = "/dev/null" if change.old is None else f"a/{change.path}"
+    tofile = f"b/{change.path}"
+    if old is None or new is None:
+        return f"Binary files {fromfile} and {tofile} differ\n"
+
+    lines = []
+    for line in difflib.unified_diff(old, new, fromfile=fromfile, tofile=tofile):
+        lines.append(line if line.endswith("\n") else line + "\n\\ No newline at end of file\n")
+    return "".join(lines)
+
+
+def print_repo_plan(
+    repoconfig: RepoConfig,
+    manifest: StaticManifest,
+    stat: bool = False,
+    environment: Environment | None = None,
+) -> int:
+    """Print the pending changes of a single repository. Returns the number of changed files."""
+    changes = plan_repo(repoconfig, manifest, environment)
+    if not changes:
+        return 0
+
+    print(f"📝 {repoconfig.local_path}: {len(changes)} files would change")
+    for change in changes:
+        added, removed = count_changed_lines(change)
+        emit(
+            "pending", repoconfig.local_path,
+            file=change.path, added=added, removed=removed, created=change.old is None,
+        )
+        if stat:
+            print(f"   {change.path} | +{added} -{removed}")
+        else:
+            print(format_diff(change), end="")
+    return len(changes)
+
+
+def print_plan(
+    repoconfigs: list[RepoConfig],
+    jobs: int = 1,
+    stat: bool = False,
+    manifest: StaticManifest | None = None,
+    environment: Environment | None = None,
+) -> int:
+    """Print the pending changes of all repositories in the config order.
+
+    Everything is rendered in memory and compared against the working trees, so no file is
+    written and Git is not touched. Returns the total number of files that would change.
+    """
+    if manifest is None:
+        manifest = StaticManifest()
+
+    worker = partial(print_repo_plan, manifest=manifest, stat=stat, environment=environment)
+    return sum(run_buffered(worker, repoconfigs, jobs=jobs))
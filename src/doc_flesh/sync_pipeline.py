@@ -0,0 +1,154 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+from doc_flesh.events import emit
+from doc_flesh.git_utils import add_to_staging, commit_changes, commit_files, push_changes, uncommitted_files
+from doc_flesh.models import RepoConfig, SyncResult
+from doc_flesh.parallel_utils import buffered_std_streams, buffering_into, replay
+from doc_flesh.sync_state import InputDigester, SyncState
+from doc_flesh.target_file_writer import DirectorySyncer, StaticManifest, apply_jinja_template, copy_static_files
+
+
+def sync_local(
+    repoconfig: RepoConfig,
+    result: SyncResult,
+    dry_run: bool,
+    no_commit: bool,
+    manifest: StaticManifest,
+    commit_engine: str = "index",
+) -> bool:
+    """Run the local phases of a sync: render, copy, stage and commit.
+
+    The change set is the files written by this run plus the managed files that Git reports as
+    differing from HEAD, so a managed file that is already up to date on disk but not committed
+    (e.g. after an interrupted sync) is committed as well. Git is skipped only if both are empty.
+
+    With the "plumbing" commit engine the changed files are committed without staging them first.
+    Returns True if the repository has a new commit that should be pushed.
+    """
+    # The written directories are fsync'ed once for the whole repository.
+    syncer = DirectorySyncer()
+    changed_files = apply_jinja_template(repoconfig, syncer)
+    changed_files += copy_static_files(repoconfig, manifest, syncer)
+    syncer.sync()
+
+    if dry_run:
+        return False
+
+    changed_files = list(dict.fromkeys([*map(Path, changed_files), *uncommitted_files(repoconfig)]))
+    if not changed_files:
+        emit(
+            "skipped", repoconfig.local_path, reason="no changes",
+            message=f"🚫 No changes for {repoconfig.local_path}, skipping Git.",
+        )
+        return False
+
+    if commit_engine == "plumbing" and not no_commit:
+        result.committed = commit_files(repoconfig, changed_files)
+        return result.committed
+
+    staged = add_to_staging(repoconfig, changed_files)
+    if no_commit:
+        return False
+
+    result.committed = commit_changes(repoconfig, staged)
+    return result.committed
+
+
+def sync_push(repoconfig: RepoConfig, result: SyncResult):
+    """Run the network phase of a sync."""
+    push_changes(repoconfig)
+    result.pushed = True
+
+
+def run_sync_pipeline(
+    repoconfigs: list[RepoConfig],
+    jobs: int = 1,
+    dry_run: bool = False,
+    no_commit: bool = False,
+    manifest: StaticManifest | None = None,
+    state: SyncState | None = None,
+    digester: InputDigester | None = None,
+    commit_engine: str = "index",
+    force: bool = False,
+) -> list[SyncResult]:
+    """Sync all repositories so that the local phases overlap with the pushes of other repositories.
+
+    The local phases run in one pool of `jobs` workers and the pushes in another, so the push of
+    one repository never blocks rendering the next one. A failure is stored in the SyncResult of
+    that repository and the rest of the fleet is still processed. The output of each repository
+    is buffered and printed in the config order.
+
+    If a SyncState is given, repositories whose inputs have not changed since their last
+    successful sync are skipped, and the state is updated for every repository that is synced
+    completely. With force, no repository is skipped, but the state is still updated. The state
+    is ignored in dry-run and no-commit modes.
+
+    The commit_engine is either "index" or "plumbing", see defaults.COMMIT_ENGINES.
+    """
+    if manifest is None:
+        manifest = StaticManifest()
+    if dry_run or no_commit:
+        state = None
+    if state and digester is None:
+        digester = InputDigester(manifest=manifest)
+    digests: dict[int, str] = {}
+
+    results = [SyncResult(local_path=repoconfig.local_path) for repoconfig in repoconfigs]
+    outputs: list[list[tuple[str, str]]] = [[] for _ in repoconfigs]
+    push_futures: dict[int, Future] = {}
+
+    with buffered_std_streams() as local, \
+         ThreadPoolExecutor(max_workers=jobs) as local_pool, \
+         ThreadPoolExecutor(max_workers=jobs) as push_pool:
+
+        def push_worker(i: int):
+            with buffering_into(local, outputs[i]):
+                try:
+                    sync_push(repoconfigs[i], results[i])
+                except Exception as e:
+                    emit(
+                        "failed", repoconfigs[i].local_path, phase="push", error=str(e),
+                        message=f"❌ ERROR: Push failed for {repoconfigs[i].local_path}: {e}",
+                    )
+                    results[i].error = str(e)
+                    return
+            if i in digests:
+                state.update(repoconfigs[i].local_path, digests[i])
+
+        def local_worker(i: int):
+            with buffering_into(local, outputs[i]):
+                try:
+                    if state:
+                        digests[i] = digester.repo_digest(repoconfigs[i])
+                        if not force and state.is_current(repoconfigs[i].local_path, digests[i]):
+                            emit(
+                                "skipped", repoconfigs[i].local_path, reason="inputs unchanged",
+                                message=f"⏭️  Inputs unchanged since the last sync, skipping {repoconfigs[i].local_path}",
+                            )
+                            results[i].skipped = True
+                            return
+                    needs_push = sync_local(
+                        repoconfigs[i], results[i], dry_run, no_commit, manifest, commit_engine
+                    )
+                except Exception as e:
+                    emit(
+                        "failed", repoconfigs[i].local_path, phase="sync", error=str(e),
+                        message=f"❌ ERROR: Sync failed for {repoconfigs[i].local_path}: {e}",
+                    )
+                    results[i].error = str(e)
+                    return
+            if needs_push:
+                push_futures[i] = push_pool.submit(push_worker, i)
+            elif i in digests:
+                state.update(repoconfigs[i].local_path, digests[i])
+
+        local_futures = [local_pool.submit(local_worker, i) for i in range(len(repoconfigs))]
+
+        for i, local_future in enumerate(local_futures):
+            local_future.result()
+            if i in push_futures:
+                push_futures[i].result()
+            replay(outputs[i])
+
+    return results
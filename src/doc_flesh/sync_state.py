@@ -0,0 +1,85 @@
+import hashlib
+import json
+import os
+import threading
+
+from pathlib import Path
+from jinja2 import Environment, meta
+from doc_flesh.configtools.config_reader import CACHE_DIR
+from doc_flesh.models import RepoConfig
+from doc_flesh.target_file_writer import StaticManifest, get_jinja_environment
+
+SYNC_STATE = CACHE_DIR / "sync-state.json"
+
+
+class InputDigester:
+    """Compute a digest of every input that affects the files doc-flesh writes to a repository.
+
+    The inputs are the template sources (including the templates they include, import or extend),
+    the static sources, the resolved file lists, the flags and the siteinfo. Each template and
+    static source is hashed once per run, no matter how many repositories use it.
+
+    Note that the output of templates using the jinja2_time extension also depends on the
+    current time, which is not part of the digest. Use `sync --force` to re-render those.
+    """
+
+    def __init__(self, environment: Environment | None = None, manifest: StaticManifest | None = None):
+        self.environment = environment or get_jinja_environment()
+        self.manifest = manifest or StaticManifest()
+        self._templates: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def template_digest(self, name: str, _parents: tuple[str, ...] = ()) -> str:
+        """Digest of a template and, recursively, every template it references."""
+        with self._lock:
+            if name in self._templates:
+                return self._templates[name]
+
+        source, _, _ = self.environment.loader.get_source(self.environment, name)
+        digest = hashlib.sha256(source.encode())
+        referenced = meta.find_referenced_templates(self.environment.parse(source))
+        parents = _parents + (name,)
+        for child in sorted(ref for ref in referenced if ref and ref not in parents):
+            digest.update(self.template_digest(child, parents).encode())
+
+        with self._lock:
+            self._templates[name] = digest.hexdigest()
+        return self._templates[name]
+
+    def repo_digest(self, repoconfig: RepoConfig) -> str:
+        """Digest of all inputs of a single repository."""
+        digest = hashlib.sha256()
+        digest.update(repoconfig.model_dump_json(include={"jinja_files", "static_files", "flags", "siteinfo"}).encode())
+        for jinjafile in repoconfig.jinja_files:
+            digest.update(self.template_digest(str(jinjafile)).encode())
+        for static_file in repoconfig.static_files:
+            digest.update(self.manifest.source_digest(Path(static_file)).encode())
+        return digest.hexdigest()
+
+
+class SyncState:
+    """The input digest of every repository at the time of its last successful sync."""
+
+    def __init__(self, path: Path = SYNC_STATE):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            self._digests: dict[str, str] = json.loads(path.read_text())
+        except (FileNotFoundError, ValueError):
+            self._digests = {}
+
+    def is_current(self, local_path: Path, digest: str) -> bool:
+        with self._lock:
+            return self._digests.get(str(local_path)) == digest
+
+    def update(self, local_path: Path, digest: str):
+        with self._lock:
+            self._digests[str(local_path)] = digest
+
+    def save(self):
+        """Write the state atomically."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with self._lock:
+            tmp_path.write_text(json.dumps(self._digests, indent=2, sort_keys=True))
+        os.replace(tmp_path, self.path)
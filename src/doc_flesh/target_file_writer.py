@@ -1,68 +1,327 @@
+import hashlib
 import shutil
 import os
+import tempfile
+import threading
+import time
 
-from jinja2 import Environment, FileSystemLoader, Template
+from functools import lru_cache
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
 from pathlib import Path
+from typing import BinaryIO, Iterable
+from doc_flesh.events import emit
 from doc_flesh.models import RepoConfig
 from doc_flesh.models.transformations import transform_to_jinja_variables
+from doc_flesh.timings import timed
+
+TEMPLATE_DIR = Path("~/.config/doc-flesh/templates").expanduser()
+STATIC_DIR = Path("~/.config/doc-flesh/static").expanduser()
+BYTECODE_CACHE_DIR = Path("~/.cache/doc-flesh/jinja").expanduser()
+COPY_BLOCK_SIZE = 1024 * 1024
 
 def make_file_readonly(file_path: Path):
     os.chmod(file_path, 0o444)
 
-def make_file_writable(file_path: Path):
-    os.chmod(file_path, 0o644)
+class DirectorySyncer:
+    """Collect the directories that got new entries and fsync each of them only once.
+
+    The files are replaced by renaming, and a rename is only durable once its directory is
+    fsync'ed. Syncing once per repository instead of once per file keeps a fleet-wide sync cheap.
+    """
+
+    def __init__(self):
+        self._dirs: set[Path] = set()
 
-def render_jinja_to_file(jinja_template: Template, output_path: Path, jinja_variables: dict):
-    # Make sure we can write
-    if output_path.exists():
-        make_file_writable(output_path)
+    def add(self, directory: Path):
+        self._dirs.add(directory)
 
-    # Generate content
-    output = jinja_template.render(jinja_variables)
+    def sync(self):
+        for directory in sorted(self._dirs):
+            fd = os.open(directory, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        self._dirs.clear()
 
-    # Write and make read-only
+def open_temp_file(output_path: Path):
+    """Open a new temporary file next to output_path, so that it can be renamed over it."""
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text(output)
-    make_file_readonly(output_path)
+    fd, tmp_name = tempfile.mkstemp(dir=output_path.parent, prefix=f".{output_path.name}.", suffix=".tmp")
+    return os.fdopen(fd, "wb"), Path(tmp_name)
 
-def apply_jinja_template(repoconfig: RepoConfig):
-    """Apply Jinja template to the Template file and write it to the destination."""
+def replace_readonly(tmp_path: Path, output_path: Path, syncer: DirectorySyncer | None = None):
+    """Make the temporary file read-only and atomically rename it over output_path."""
+    make_file_readonly(tmp_path)
+    os.replace(tmp_path, output_path)
+    if syncer is not None:
+        syncer.add(output_path.parent)
 
-    print(f"\n📄 Applying Jinja template to {repoconfig.siteinfo.site_name}...")
+def copy_prefix(src: BinaryIO, dst: BinaryIO, length: int):
+    """Copy the first `length` bytes of src to dst in fixed-size blocks."""
+    src.seek(0)
+    while length > 0:
+        block = src.read(min(COPY_BLOCK_SIZE, length))
+        if not block:
+            break
+        dst.write(block)
+        length -= len(block)
+
+def stream_to_file(output_path: Path, chunks: Iterable[bytes], syncer: DirectorySyncer | None = None) -> bool:
+    """Write the chunks to output_path atomically. Returns True if the file was changed.
+
+    The chunks are compared against the existing file while they are produced. As long as they
+    match, nothing is written. At the first difference, the matching prefix and the rest of the
+    chunks are streamed into a temporary file in the same directory, which is then renamed over
+    the target with the read-only mode already set. A crash therefore never leaves a truncated or
+    writable file behind, and memory use does not depend on the size of the output.
+    """
+    try:
+        existing = output_path.open("rb")
+    except FileNotFoundError:
+        existing = None
+
+    tmp_file, tmp_path, matched = None, None, 0
+    try:
+        for chunk in chunks:
+            if tmp_file is None and existing is not None:
+                if existing.read(len(chunk)) == chunk:
+                    matched += len(chunk)
+                    continue
+            if tmp_file is None:
+                tmp_file, tmp_path = open_temp_file(output_path)
+                if matched:
+                    copy_prefix(existing, tmp_file, matched)
+            tmp_file.write(chunk)
+
+        if tmp_file is None:
+            # Identical output leaves the file untouched, keeping its mtime intact so that
+            # Git does not need to re-hash it.
+            if existing is not None and existing.read(1) == b"":
+                return False
+            # The new output is a prefix of the existing file (or empty).
+            tmp_file, tmp_path = open_temp_file(output_path)
+            if matched:
+                copy_prefix(existing, tmp_file, matched)
+
+        tmp_file.close()
+        replace_readonly(tmp_path, output_path, syncer)
+        return True
+    except BaseException:
+        if tmp_file is not None:
+            tmp_file.close()
+            tmp_path.unlink(missing_ok=True)
+        raise
+    finally:
+        if existing is not None:
+            existing.close()
 
-    # Step 0: Setup the Jinja environment.
-    template_dir = Path("~/.config/doc-flesh/templates").expanduser()
-    environment = Environment(
-        loader=FileSystemLoader(template_dir), extensions=["jinja2_time.TimeExtension"]
+def render_jinja_to_file(
+    jinja_template: Template, output_path: Path, jinja_variables: dict, syncer: DirectorySyncer | None = None
+) -> bool:
+    """Render the template into output_path. Returns True if the file was changed.
+
+    The output is streamed from Template.generate(), see stream_to_file().
+    """
+    chunks = (chunk.encode() for chunk in jinja_template.generate(jinja_variables))
+    return stream_to_file(output_path, chunks, syncer)
+
+@lru_cache(maxsize=None)
+def get_jinja_environment(
+    template_dir: Path = TEMPLATE_DIR, bytecode_cache_dir: Path | None = BYTECODE_CACHE_DIR
+) -> Environment:
+    """Return the Jinja environment shared by all repositories in this process.
+
+    Each template is compiled once per process. The compiled bytecode is also stored on disk
+    so that the next CLI run can skip compiling. Jinja invalidates the bytecode automatically
+    when the source of the template changes.
+    """
+    bytecode_cache = None
+    if bytecode_cache_dir is not None:
+        bytecode_cache_dir.mkdir(parents=True, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(str(bytecode_cache_dir))
+
+    return Environment(
+        loader=FileSystemLoader(template_dir),
+        extensions=["jinja2_time.TimeExtension"],
+        bytecode_cache=bytecode_cache,
     )
 
+@timed("render")
+def apply_jinja_template(repoconfig: RepoConfig, syncer: DirectorySyncer | None = None) -> list[Path]:
+    """Apply Jinja template to the Template file and write it to the destination.
+
+    Returns the list of files (relative to the repository) that were changed. The directories
+    are fsync'ed at the end, unless a shared syncer is given (then the caller syncs it).
+    """
+
+    print(f"\n📄 Applying Jinja template to {repoconfig.siteinfo.site_name}...")
+
+    # Step 0: Get the shared Jinja environment.
+    environment = get_jinja_environment()
+
     jinja_variables = transform_to_jinja_variables(repoconfig).model_dump()
 
+    own_syncer = syncer is None
+    if own_syncer:
+        syncer = DirectorySyncer()
+
+    changed_files = []
     for jinjafile in repoconfig.jinja_files:
+        start = time.perf_counter()
         jinja_template = environment.get_template(str(jinjafile))
         output_path = Path(repoconfig.local_path) / jinjafile
 
-        render_jinja_to_file(jinja_template, output_path, jinja_variables)
+        changed = render_jinja_to_file(jinja_template, output_path, jinja_variables, syncer)
+        if changed:
+            changed_files.append(Path(jinjafile))
+        emit(
+            "rendered" if changed else "unchanged", repoconfig.local_path,
+            file=jinjafile, duration=time.perf_counter() - start,
+        )
+
+    if own_syncer:
+        syncer.sync()
+
+    unchanged = len(repoconfig.jinja_files) - len(changed_files)
+    print(f"Jinja template applied to {repoconfig.siteinfo.site_name} ({len(changed_files)} changed, {unchanged} unchanged).")
+    return changed_files
+
+def render_static_to_file(static_file: Path, output_path: Path, syncer: DirectorySyncer | None = None):
+    """Copy the file atomically through a temporary file in the destination directory.
+
+    The mtime is preserved so that the next run can use it as a quick check.
+    """
+    tmp_file, tmp_path = open_temp_file(output_path)
+    try:
+        with tmp_file, static_file.open("rb") as src:
+            shutil.copyfileobj(src, tmp_file, COPY_BLOCK_SIZE)
+        shutil.copystat(static_file, tmp_path)
+        replace_readonly(tmp_path, output_path, syncer)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+def file_digest(file_path: Path) -> str:
+    """Return the SHA-256 hex digest of a file."""
+    with file_path.open("rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+class StaticManifest:
+    """Content-addressed table of the static source files for a single run.
+
+    Each source file is stat'ed and hashed at most once per run, no matter how many
+    repositories use it. A destination is compared against the table using a cheap
+    size/mtime check first and hashed only if that is not conclusive.
+    Safe to share between threads.
+    """
+
+    def __init__(self, base_dir: Path = STATIC_DIR):
+        self.base_dir = base_dir
+        self._stats: dict[Path, os.stat_result] = {}
+        self._digests: dict[Path, str] = {}
+        self._digest_locks: dict[Path, threading.Lock] = {}
+        self._lock = threading.Lock()
 
-    print(f"Jinja template applied to {repoconfig.siteinfo.site_name}.")
+        self.files_copied = 0
+        self.files_skipped = 0
+        self.bytes_copied = 0
+        self.bytes_skipped = 0
 
-def render_static_to_file(static_file: Path, output_path: Path):
-    # Make sure we can write
-    if output_path.exists():
-        make_file_writable(output_path)
+    def source_stat(self, static_file: Path) -> os.stat_result:
+        with self._lock:
+            if static_file not in self._stats:
+                self._stats[static_file] = (self.base_dir / static_file).stat()
+            return self._stats[static_file]
 
-    # Copy the file
-    shutil.copy(static_file, output_path)
-    make_file_readonly(output_path)
+    def source_digest(self, static_file: Path) -> str:
+        with self._lock:
+            if static_file in self._digests:
+                return self._digests[static_file]
+            file_lock = self._digest_locks.setdefault(static_file, threading.Lock())
 
-def copy_static_files(repoconfig: RepoConfig):
-    """Copy the static files to the destination."""
+        # Hash outside the manifest-wide lock, so that a large file only blocks the threads
+        # waiting for that same file.
+        with file_lock:
+            with self._lock:
+                digest = self._digests.get(static_file)
+            if digest is None:
+                digest = file_digest(self.base_dir / static_file)
+                with self._lock:
+                    self._digests[static_file] = digest
+            return digest
 
-    base_dir = Path("~/.config/doc-flesh/static").expanduser()
+    def is_up_to_date(self, static_file: Path, dst: Path, align_mtime: bool = True) -> bool:
+        """Check if dst already has the same content as the source of static_file.
 
+        If only the mtime differs, it is set to the source's, so the next run takes the fast path.
+        With align_mtime=False, dst is left untouched.
+        """
+        src_stat = self.source_stat(static_file)
+        try:
+            dst_stat = dst.stat()
+        except FileNotFoundError:
+            return False
+
+        if dst_stat.st_size != src_stat.st_size:
+            return False
+        if dst_stat.st_mtime_ns == src_stat.st_mtime_ns:
+            return True
+        if file_digest(dst) != self.source_digest(static_file):
+            return False
+        if align_mtime:
+            os.utime(dst, ns=(dst_stat.st_atime_ns, src_stat.st_mtime_ns))
+        return True
+
+    def record(self, static_file: Path, copied: bool):
+        size = self.source_stat(static_file).st_size
+        with self._lock:
+            if copied:
+                self.files_copied += 1
+                self.bytes_copied += size
+            else:
+                self.files_skipped += 1
+                self.bytes_skipped += size
+
+    def summary(self) -> str:
+        return (
+            f"📦 Static files: {self.files_copied} copied ({self.bytes_copied} bytes), "
+            f"{self.files_skipped} unchanged ({self.bytes_skipped} bytes skipped)."
+        )
+
+@timed("copy_static")
+def copy_static_files(
+    repoconfig: RepoConfig, manifest: StaticManifest | None = None, syncer: DirectorySyncer | None = None
+) -> list[Path]:
+    """Copy the static files that differ from the source to the destination.
+
+    Returns the list of files (relative to the repository) that were written.
+    Pass the same manifest for all repositories of a run to hash each source only once.
+    The directories are fsync'ed at the end, unless a shared syncer is given.
+    """
+    if manifest is None:
+        manifest = StaticManifest()
+    own_syncer = syncer is None
+    if own_syncer:
+        syncer = DirectorySyncer()
+
+    written_files = []
     for static_file in repoconfig.static_files:
-        src = base_dir / static_file
+        start = time.perf_counter()
+        static_file = Path(static_file)
+        src = manifest.base_dir / static_file
         dst = Path(repoconfig.local_path) / static_file
-        dst.parent.mkdir(parents=True, exist_ok=True)
-        
-        render_static_to_file(src, dst)
+
+        if manifest.is_up_to_date(static_file, dst):
+            manifest.record(static_file, copied=False)
+            emit("unchanged", repoconfig.local_path, file=static_file, duration=time.perf_counter() - start)
+            continue
+
+        render_static_to_file(src, dst, syncer)
+        manifest.record(static_file, copied=True)
+        written_files.append(static_file)
+        emit("copied", repoconfig.local_path, file=static_file, duration=time.perf_counter() - start)
+
+    if own_syncer:
+        syncer.sync()
+    return written_files
@@ -0,0 +1,143 @@
+import json
+import math
+import threading
+import time
+
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class TimingRecorder:
+    """Collect the durations of spans, grouped by repository and phase.
+
+    Disabled by default. When disabled, a span costs a single attribute lookup.
+    Safe to use from several threads.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._spans: list[tuple[str, str, float]] = []
+        self._lock = threading.Lock()
+
+    def add(self, phase: str, repo: str, seconds: float):
+        with self._lock:
+            self._spans.append((repo, phase, seconds))
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+    def per_repo(self) -> dict[str, dict[str, float]]:
+        """Total seconds per phase for each repository. Spans without a repository are under ""."""
+        repos: dict[str, dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        with self._lock:
+            for repo, phase, seconds in self._spans:
+                repos[repo][phase] += seconds
+        return {repo: dict(phases) for repo, phases in repos.items()}
+
+    def report(self) -> dict:
+        """Per-repo, per-phase durations plus fleet totals and p50/p95 for each phase."""
+        per_repo = self.per_repo()
+        by_phase: dict[str, list[float]] = defaultdict(list)
+        for repo, phases in per_repo.items():
+            if repo:
+                for phase, seconds in phases.items():
+                    by_phase[phase].append(seconds)
+
+        fleet = {
+            phase: {
+                "total": round(sum(values), 6),
+                "count": len(values),
+                "p50": round(percentile(values, 50), 6),
+                "p95": round(percentile(values, 95), 6),
+            }
+            for phase, values in by_phase.items()
+        }
+        return {
+            "repos": {
+                repo: {phase: round(seconds, 6) for phase, seconds in phases.items()}
+                for repo, phases in per_repo.items() if repo
+            },
+            "global": {phase: round(seconds, 6) for phase, seconds in per_repo.get("", {}).items()},
+            "fleet": fleet,
+        }
+
+    def write_report(self, path: Path):
+        path.write_text(json.dumps(self.report(), indent=2))
+
+    def slowest_repos(self, count: int = 5) -> list[tuple[str, float, str]]:
+        """The slowest repositories as (repo, total seconds, slowest phase).
+
+        Nested spans are not double counted: the total is the sum of the top-level phases.
+        """
+        rows = []
+        for repo, phases in self.per_repo().items():
+            if not repo:
+                continue
+            top_level = {phase: seconds for phase, seconds in phases.items() if "." not in phase} or phases
+            slowest_phase = max(top_level, key=top_level.get)
+            rows.append((repo, sum(top_level.values()), slowest_phase))
+        return sorted(rows, key=lambda row: row[1], reverse=True)[:count]
+
+    def print_summary(self, count: int = 5):
+        rows = self.slowest_repos(count)
+        if not rows:
+            return
+        print()
+        print("⏱️  Slowest repos:")
+        for repo, seconds, slowest_phase in rows:
+            print(f"   {seconds:7.2f}s  {repo}  (mostly {slowest_phase})")
+
+
+RECORDER = TimingRecorder()
+_current = threading.local()
+
+
+@contextmanager
+def span(phase: str, repo: object = None):
+    """Time the block as `phase` of `repo`.
+
+    Without a repo, the span belongs to the repo of the enclosing span of the same thread
+    (or to the whole run, if there is none). Sub-phases are named like "check.fetch".
+    """
+    if not RECORDER.enabled:
+        yield
+        return
+
+    parent_repo = getattr(_current, "repo", "")
+    repo = parent_repo if repo is None else str(repo)
+    _current.repo = repo
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        RECORDER.add(phase, repo, time.perf_counter() - start)
+        _current.repo = parent_repo
+
+
+def timed(phase: str):
+    """Decorator version of span(). The repo is taken from the `local_path` of the first argument."""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not RECORDER.enabled:
+                return func(*args, **kwargs)
+            repo = getattr(args[0], "local_path", None) if args else None
+            with span(phase, repo):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -1,28 +1,198 @@
+import hashlib
+import json
+import os
+import shutil
 import subprocess
+import threading
+import time
+import tomllib
 from pathlib import Path
 from typing import Optional
+from doc_flesh.events import emit
 from doc_flesh.models import RepoConfig
+from doc_flesh.parallel_utils import run_buffered
+from doc_flesh.timings import timed
 
-def update_uv_dependencies(repoconfigs: list[RepoConfig]) -> bool:
+def uv_environment(uv_cache_dir: Optional[Path] = None) -> dict[str, str]:
+    """Environment for the uv processes. All of them share the same cache directory,
+    so the resolution metadata is downloaded only once for the whole fleet.
+    """
+    env = dict(os.environ)
+    if uv_cache_dir is not None:
+        env["UV_CACHE_DIR"] = str(uv_cache_dir)
+    return env
+
+def decode_output(output: bytes | str | None) -> str:
+    if isinstance(output, bytes):
+        return output.decode(errors="replace")
+    return output or ""
+
+def dependency_digest(repo: Path) -> Optional[str]:
+    """Digest of everything in a repository that affects the resolved uv.lock.
+
+    The project name and other metadata are left out, so repositories that only differ by
+    their name get the same digest. Returns None if the repository has no readable pyproject.toml,
+    so that a broken repository fails on its own in 'uv lock' instead of stopping the whole fleet.
+    """
+    pyproject_path = repo / "pyproject.toml"
+    try:
+        pyproject = tomllib.loads(pyproject_path.read_text())
+    except (FileNotFoundError, tomllib.TOMLDecodeError, UnicodeDecodeError):
+        return None
+
+    project = pyproject.get("project", {})
+    python_version_path = repo / ".python-version"
+    uv_toml_path = repo / "uv.toml"
+    inputs = {
+        "dependencies": project.get("dependencies", []),
+        "optional-dependencies": project.get("optional-dependencies", {}),
+        "requires-python": project.get("requires-python"),
+        "dependency-groups": pyproject.get("dependency-groups", {}),
+        "build-system": pyproject.get("build-system", {}),
+        "tool.uv": pyproject.get("tool", {}).get("uv", {}),
+        "python-version": python_version_path.read_text().strip() if python_version_path.exists() else None,
+        "uv.toml": uv_toml_path.read_text() if uv_toml_path.exists() else None,
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+def group_by_dependencies(repoconfigs: list[RepoConfig]) -> list[list[RepoConfig]]:
+    """Group the repositories with identical dependency inputs, keeping the config order.
+
+    Repositories without a readable pyproject.toml are always in a group of their own.
+    """
+    groups: dict[str, list[RepoConfig]] = {}
+    for i, repoconfig in enumerate(repoconfigs):
+        digest = dependency_digest(Path(repoconfig.local_path)) or f"ungrouped-{i}"
+        groups.setdefault(digest, []).append(repoconfig)
+    return list(groups.values())
+
+@timed("uv_lock")
+def run_uv_lock(
+    repoconfig: RepoConfig, env: dict[str, str], stop: threading.Event, args: tuple[str, ...] = ("--upgrade",)
+) -> bool:
+    """Run 'uv lock' in a single repository and print its captured output on failure."""
+    repo = Path(repoconfig.local_path)
+
+    if stop.is_set():
+        emit(
+            "skipped", repo, reason="earlier failure",
+            message=f"⏭️  Skipped {repo} because of an earlier failure.",
+        )
+        return False
+
+    start = time.perf_counter()
+    try:
+        subprocess.run(["uv", "lock", *args], cwd=str(repo), check=True, capture_output=True, env=env)
+    except subprocess.CalledProcessError as e:
+        emit(
+            "failed", repo, phase="uv_lock", error=str(e), duration=time.perf_counter() - start,
+            message=f"❌ ERROR: Failed to update dependencies in {repo}. Error: {e}",
+        )
+        output = decode_output(e.stderr) or decode_output(e.output)
+        if output:
+            print(output.rstrip())
+        return False
+    except FileNotFoundError:
+        emit(
+            "failed", repo, phase="uv_lock", error="uv not found",
+            message=f"❌ ERROR: 'uv' command not found. Please install it.",
+        )
+        stop.set()  # No point in trying the other repositories
+        return False
+
+    emit("locked", repo, message=f"✅ Updated uv.lock in {repo}", duration=time.perf_counter() - start)
+    return True
+
+def seed_lockfile(repoconfig: RepoConfig, leader: RepoConfig) -> Optional[bytes]:
+    """Copy the freshly upgraded uv.lock of the group leader into a member of the group.
+
+    Returns the original uv.lock of the member (None if it had none) for restore_lockfile.
+    """
+    lock_path = Path(repoconfig.local_path) / "uv.lock"
+    try:
+        original = lock_path.read_bytes()
+    except FileNotFoundError:
+        original = None
+    shutil.copyfile(Path(leader.local_path) / "uv.lock", lock_path)
+    return original
+
+def restore_lockfile(repoconfig: RepoConfig, original: Optional[bytes]):
+    """Put back the uv.lock that a member had before it was seeded."""
+    lock_path = Path(repoconfig.local_path) / "uv.lock"
+    if original is None:
+        lock_path.unlink(missing_ok=True)
+    else:
+        lock_path.write_bytes(original)
+
+def update_uv_dependencies(
+    repoconfigs: list[RepoConfig],
+    jobs: int = 1,
+    fail_fast: bool = False,
+    uv_cache_dir: Optional[Path] = None,
+    reuse_locks: bool = True,
+) -> bool:
     """
     Update UV dependencies by running 'uv lock --upgrade' in each repository.
+
+    Up to `jobs` uv processes run at the same time. The output of each repository is captured
+    and printed in the config order. By default all repositories are processed and the failures
+    are listed at the end. With fail_fast, no new repositories are started after the first failure.
+
+    With reuse_locks, the repositories are grouped by their dependency inputs and only the first
+    repository of each group is upgraded. Its uv.lock is copied to each other member right before
+    that member's own 'uv lock', which keeps the seeded versions and only fixes the
+    project-specific entries. This is a plain 'uv lock', not a check-only verification
+    ('uv lock --check' would fail on the leader's project name). If it fails or is skipped,
+    the member's original uv.lock is restored.
     """
+    env = uv_environment(uv_cache_dir)
+    stop = threading.Event()
+
+    def worker(repoconfig: RepoConfig, args: tuple[str, ...] = ("--upgrade",)) -> bool:
+        ok = run_uv_lock(repoconfig, env, stop, args)
+        if not ok and fail_fast:
+            stop.set()
+        return ok
+
+    groups = group_by_dependencies(repoconfigs) if reuse_locks else [[repoconfig] for repoconfig in repoconfigs]
+    if len(groups) < len(repoconfigs):
+        print(f"🔗 {len(repoconfigs)} repositories share {len(groups)} distinct dependency sets.")
+
+    # Phase 1: Upgrade the first repository of each group.
+    leaders = [group[0] for group in groups]
+    ok_by_path = {
+        leader.local_path: ok for leader, ok in zip(leaders, run_buffered(worker, leaders, jobs=jobs))
+    }
 
-    all_safe = True
+    # Phase 2: Re-lock the other members against the lockfile of their leader.
+    def member_worker(member: RepoConfig, leader: RepoConfig) -> bool:
+        if stop.is_set():
+            return worker(member, ())  # Reports the skip without touching uv.lock
+        original = seed_lockfile(member, leader)
+        ok = worker(member, ())
+        if not ok:
+            restore_lockfile(member, original)
+        return ok
 
-    for repoconfig in repoconfigs:
+    members = []
+    for group in groups:
+        for member in group[1:]:
+            if ok_by_path[group[0].local_path]:
+                members.append((member, group[0]))
+            else:
+                emit(
+                    "failed", member.local_path, phase="uv_lock", error=f"{group[0].local_path} failed",
+                    message=f"❌ ERROR: Skipped {member.local_path} because {group[0].local_path} failed.",
+                )
+                ok_by_path[member.local_path] = False
 
-        repo = Path(repoconfig.local_path)
+    for (member, _), ok in zip(members, run_buffered(lambda pair: member_worker(*pair), members, jobs=jobs)):
+        ok_by_path[member.local_path] = ok
 
-        try:
-            subprocess.run(["uv", "lock", "--upgrade"], cwd=str(repo), check=True)
-        except subprocess.CalledProcessError as e:
-            print(f"❌ ERROR: Failed to update dependencies in {repo}. Error: {e}")
-            all_safe = False
-            break
-        except FileNotFoundError:
-            print(f"❌ ERROR: 'uv' command not found. Please install it.")
-            all_safe = False
-            break
+    failed = [repoconfig.local_path for repoconfig in repoconfigs if not ok_by_path[repoconfig.local_path]]
+    if failed and len(repoconfigs) > 1:
+        print(f"❌ Updating dependencies failed in {len(failed)}/{len(repoconfigs)} repositories:")
+        for local_path in failed:
+            print(f"   - {local_path}")
 
-    return all_safe
\ No newline at end of file
+    return not failed
@@ -0,0 +1,255 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+from pathlib import Path
+from jinja2 import Environment
+from doc_flesh.configtools.config_reader import CONFIG, get_siteinfo, load_config
+from doc_flesh.configtools.reverse_index import build_reverse_index, repos_for_changes
+from doc_flesh.defaults import DEFAULT_DEBOUNCE, DEFAULT_POLL_INTERVAL
+from doc_flesh.models import RepoConfig
+from doc_flesh.plan import print_plan
+from doc_flesh.target_file_writer import StaticManifest, get_jinja_environment
+
+# Subdirectories of the config directory whose files are used by the sync.
+WATCHED_SUBDIRS = ("templates", "static", "features")
+
+# From <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_ISDIR = 0x40000000
+IN_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+INOTIFY_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class InotifyWatcher:
+    """Report changed files in a set of directories using Linux inotify (through ctypes).
+
+    A recursive watch also watches the subdirectories, including the ones created later.
+    """
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("libc not found")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+
+        self._fd = self._libc.inotify_init1(os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: dict[int, tuple[Path, bool]] = {}
+        self._watched: set[Path] = set()
+
+    def add(self, directory: Path, recursive: bool = False):
+        directories = [directory]
+        if recursive:
+            directories += [Path(root) / name for root, dirs, _ in os.walk(directory) for name in dirs]
+
+        for path in directories:
+            if path in self._watched or not path.is_dir():
+                continue
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), IN_WATCH_MASK)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"Cannot watch {path}")
+            self._dirs[wd] = (path, recursive)
+            self._watched.add(path)
+
+    def read(self, timeout: float | None = None) -> set[Path]:
+        """Wait up to `timeout` seconds (forever if None) and return the changed paths."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        data = os.read(self._fd, 64 * 1024)
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if wd not in self._dirs or not name:
+                continue
+
+            directory, recursive = self._dirs[wd]
+            path = directory / os.fsdecode(name)
+            if mask & IN_ISDIR:
+                if mask & IN_CREATE and recursive:
+                    self.add(path, recursive=True)
+                continue
+            changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Report changed files by comparing the (mtime, size) of the files in the directories.
+
+    Used where inotify is not available.
+    """
+
+    def __init__(self, interval: float = DEFAULT_POLL_INTERVAL):
+        self.interval = interval
+        self._dirs: dict[Path, bool] = {}
+        self._snapshot: dict[Path, tuple[int, int]] = {}
+
+    def _scan(self, directory: Path, recursive: bool) -> dict[Path, tuple[int, int]]:
+        files = {}
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            return files
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if recursive:
+                    files.update(self._scan(Path(entry.path), recursive))
+            elif entry.is_file():
+                stat = entry.stat()
+                files[Path(entry.path)] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    def _scan_all(self) -> dict[Path, tuple[int, int]]:
+        files = {}
+        for directory, recursive in self._dirs.items():
+            files.update(self._scan(directory, recursive))
+        return files
+
+    def add(self, directory: Path, recursive: bool = False):
+        if directory in self._dirs:
+            return
+        self._dirs[directory] = recursive
+        self._snapshot.update(self._scan(directory, recursive))
+
+    def read(self, timeout: float | None = None) -> set[Path]:
+        """Sleep `timeout` seconds (the polling interval if None) and return the changed paths."""
+        time.sleep(self.interval if timeout is None else timeout)
+        snapshot = self._scan_all()
+        changed = {
+            path for path in snapshot.keys() | self._snapshot.keys()
+            if snapshot.get(path) != self._snapshot.get(path)
+        }
+        self._snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+def make_watcher(poll: bool = False, poll_interval: float = DEFAULT_POLL_INTERVAL):
+    """Return an inotify watcher, or a polling watcher if inotify is unavailable or poll is set."""
+    if not poll:
+        try:
+            return InotifyWatcher()
+        except (OSError, AttributeError):
+            print("⚠️  inotify is not available, polling for changes instead.")
+    return PollingWatcher(poll_interval)
+
+
+def wait_for_changes(watcher, debounce: float = DEFAULT_DEBOUNCE) -> set[Path]:
+    """Block until something changes, then keep collecting until `debounce` seconds pass quietly."""
+    changed = set()
+    while not changed:
+        changed = watcher.read()
+    while more := watcher.read(debounce):
+        changed |= more
+    return changed
+
+
+class WatchSession:
+    """Keep the config, the reverse index and the Jinja environment in memory between changes.
+
+    Each batch of changed files is mapped to the affected repositories, which are then rendered
+    in plan mode. Nothing is written to the repositories.
+    """
+
+    def __init__(
+        self,
+        yaml_path: Path = CONFIG,
+        jobs: int = 1,
+        stat: bool = False,
+        environment: Environment | None = None,
+    ):
+        self.yaml_path = yaml_path
+        self.config_dir = yaml_path.parent
+        self.jobs = jobs
+        self.stat = stat
+        self.environment = environment or get_jinja_environment(self.config_dir / "templates")
+        self.reload()
+
+    def reload(self):
+        """Read config.yaml, the features and the siteinfo files again."""
+        self.repoconfigs: dict[Path, RepoConfig] = {
+            repoconfig.local_path: repoconfig for repoconfig in load_config(self.yaml_path)
+        }
+        self.index = build_reverse_index(self.yaml_path)
+
+    def watch_all(self, watcher):
+        """Register the config directory, its subdirectories and every repository with the watcher."""
+        watcher.add(self.config_dir)
+        for subdir in WATCHED_SUBDIRS:
+            watcher.add(self.config_dir / subdir, recursive=True)
+        for local_path in self.repoconfigs:
+            watcher.add(Path(local_path))
+
+    def is_relevant(self, path: Path) -> bool:
+        if path.name == "siteinfo.json":
+            return True
+        if path == self.yaml_path:
+            return True
+        return any(path.is_relative_to(self.config_dir / subdir) for subdir in WATCHED_SUBDIRS)
+
+    def handle(self, changed: set[Path]) -> int:
+        """Render the repositories affected by the changed files. Returns the number of pending files."""
+        changed = sorted(path for path in changed if self.is_relevant(path))
+        if not changed:
+            return 0
+
+        if any(path == self.yaml_path or path.is_relative_to(self.config_dir / "features") for path in changed):
+            self.reload()
+        elif any(path.is_relative_to(self.config_dir / "templates") for path in changed):
+            # A template may include other templates than before
+            self.index = build_reverse_index(self.yaml_path)
+
+        for path in changed:
+            repoconfig = self.repoconfigs.get(path.parent)
+            if path.name == "siteinfo.json" and repoconfig is not None:
+                repoconfig.siteinfo = get_siteinfo(path.parent)
+
+        if self.yaml_path in changed:
+            affected = list(self.repoconfigs)
+        else:
+            affected = repos_for_changes(self.index, changed, self.config_dir)
+
+        print()
+        print(f"🔁 {', '.join(str(path) for path in changed)} changed, {len(affected)} repos affected.")
+        pending = print_plan(
+            [self.repoconfigs[local_path] for local_path in affected],
+            jobs=self.jobs,
+            stat=self.stat,
+            manifest=StaticManifest(self.config_dir / "static"),
+            environment=self.environment,
+        )
+        print(f"📋 {pending} files would change." if pending else "✅ Nothing to sync.")
+        return pending
+
+    def run(self, watcher, debounce: float = DEFAULT_DEBOUNCE):
+        """Handle changes until interrupted. Errors (e.g. a half-written template) do not stop the loop."""
+        self.watch_all(watcher)
+        print(f"👀 Watching {self.config_dir} and {len(self.repoconfigs)} repos. Press Ctrl+C to stop.")
+        while True:
+            changed = wait_for_changes(watcher, debounce)
+            try:
+                self.handle(changed)
+                self.watch_all(watcher)  # Repos added to config.yaml
+            except Exception as e:
+                print(f"❌ ERROR: {e}")
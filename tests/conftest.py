@@ -17,6 +17,9 @@ from doc_flesh.models import (
     FeatureConfig,
     RepoConfigFlags,
 )
+from doc_flesh.sync_state import InputDigester
+from doc_flesh.target_file_writer import StaticManifest
+from jinja2 import Environment, FileSystemLoader
 
 
 @dataclass
@@ -219,3 +222,37 @@ def setup_config_file(tmp_path: Path) -> Path:
     siteinfo2_path.write_text(yaml.dump(siteinfo2.model_dump(mode="json")))
 
     return config_path
+
+
+@pytest.fixture
+def make_digester():
+    """Fixture that returns a factory for InputDigesters reading base_dir/templates and base_dir/static.
+
+    Each call gives a fresh digester, i.e. a fresh per-run cache.
+    """
+
+    def factory(base_dir: Path) -> InputDigester:
+        template_dir = base_dir / "templates"
+        template_dir.mkdir(exist_ok=True)
+        static_dir = base_dir / "static"
+        static_dir.mkdir(exist_ok=True)
+        environment = Environment(loader=FileSystemLoader(template_dir))
+        return InputDigester(environment=environment, manifest=StaticManifest(static_dir))
+
+    return factory
+
+
+@pytest.fixture
+def fake_apply_jinja_template():
+    """Fixture that returns a replacement for apply_jinja_template, to be patched into sync_pipeline.
+
+    It writes "Rendered content" to every managed Jinja file without needing the
+    ~/.config/doc-flesh/templates directory.
+    """
+
+    def fake(repoconfig: RepoConfig, syncer=None):
+        for jinjafile in repoconfig.jinja_files:
+            (repoconfig.local_path / jinjafile).write_text("Rendered content")
+        return list(repoconfig.jinja_files)
+
+    return fake
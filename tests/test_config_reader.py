@@ -1,5 +1,6 @@
-from doc_flesh.configtools.config_reader import load_config, repo_local_paths_to_tmp, get_siteinfo
+from doc_flesh.configtools.config_reader import load_config, repo_local_paths_to_tmp, get_siteinfo, FeatureRegistry
 from pathlib import Path
+import os
 import yaml
 
 def test_load_config(setup_config_file):
@@ -199,3 +200,49 @@ def test_multiple_features_with_overlapping_flags(tmp_path: Path):
     assert 'docs/javascripts/mathjax.js' in static_files
     assert '.pre-commit-config.yaml' in static_files
     assert '.pre-commit-guide.md' in static_files
+
+
+def test_feature_registry_loads_once_and_invalidates(setup_config_file):
+    """Test that a feature is parsed once and parsed again only after the file changes."""
+    # Arrange
+    registry = FeatureRegistry()
+    feature_path = setup_config_file.parent / "features" / "feature1.yaml"
+
+    # Act
+    first = registry.get(feature_path)
+    cached = registry.get(feature_path)
+    # Change the file (and its mtime) to invalidate the cached feature
+    feature_path.write_text(yaml.dump({"jinja_files": ["changed.md"]}))
+    stat = feature_path.stat()
+    os.utime(feature_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    reloaded = registry.get(feature_path)
+
+    # Assert
+    assert cached is first
+    assert reloaded is not first
+    assert reloaded.jinja_files == [Path("changed.md")]
+
+
+def test_load_config_snapshot(setup_config_file, tmp_path):
+    """Test that the snapshot is reused and only the stale entries are rebuilt."""
+    # Arrange
+    cache_dir = tmp_path / "cache"
+    siteinfo_path = setup_config_file.parent.parent / "repo_1" / "siteinfo.json"
+
+    # Act
+    first = load_config(setup_config_file, cache_dir=cache_dir)
+    # Unchanged inputs: the snapshot gives the same result
+    second = load_config(setup_config_file, cache_dir=cache_dir)
+    # Change the siteinfo.json of repo_1 only
+    siteinfo_path.write_text(yaml.dump({
+        "site_name": "Renamed Repo 1",
+        "site_name_slug": "renamed-repo-1",
+        "category": "Learning tools",
+    }))
+    third = load_config(setup_config_file, cache_dir=cache_dir)
+
+    # Assert
+    assert (cache_dir / "config-snapshot.json").exists()
+    assert [c.model_dump() for c in second] == [c.model_dump() for c in first]
+    assert third[0].siteinfo.site_name == "Renamed Repo 1"
+    assert third[1].siteinfo.site_name == "Test Repo 2"
@@ -0,0 +1,108 @@
+import os
+import yaml
+
+from pathlib import Path
+
+from doc_flesh.configtools import discovery
+from doc_flesh.configtools.config_reader import load_config
+from doc_flesh.configtools.discovery import discover_repos, expand_config_entries
+from doc_flesh.models import ConfigEntries, ConfigEntry, DiscoveryRoot, SiteInfo, SiteCategory
+
+
+def make_repo(path: Path) -> Path:
+    """Create a directory that looks like a managed repository: a .git directory and a siteinfo.json."""
+    (path / ".git").mkdir(parents=True)
+    siteinfo = SiteInfo(site_name=path.name, site_name_slug=path.name, category=SiteCategory.learning_tools)
+    (path / "siteinfo.json").write_text(siteinfo.model_dump_json())
+    return path
+
+
+def make_tree(root: Path) -> tuple[Path, Path]:
+    """Create two discoverable repositories and several directories that must not be discovered."""
+    repo_a = make_repo(root / "a")
+    repo_b = make_repo(root / "group" / "b")
+    make_repo(root / "group" / "deep" / "x" / "too-deep")
+    make_repo(root / ".hidden" / "d")
+    make_repo(root / "a" / "nested")  # Repositories are not descended into
+    (root / "plain" / ".git").mkdir(parents=True)  # No siteinfo.json
+    return repo_a, repo_b
+
+
+def test_discover_repos(tmp_path):
+    """Test that only repositories within max_depth are found and they get the features of their root."""
+    # Arrange
+    repo_a, repo_b = make_tree(tmp_path / "root")
+    root = DiscoveryRoot(path=tmp_path / "root", max_depth=2, features=["default", "mathjax"])
+
+    # Act
+    found = discover_repos([root])
+
+    # Assert
+    assert list(found) == [repo_a, repo_b]
+    assert found[repo_a].features == ["default", "mathjax"]
+
+
+def test_discover_repos_reuses_the_index(tmp_path, monkeypatch):
+    """Test that the cached index is reused and only changed directories are scanned again."""
+    # Arrange
+    repo_a, repo_b = make_tree(tmp_path / "root")
+    root = DiscoveryRoot(path=tmp_path / "root", max_depth=2)
+    cache_dir = tmp_path / "cache"
+    discover_repos([root], cache_dir)
+    scanned = []
+    original_scandir = os.scandir
+    monkeypatch.setattr(discovery.os, "scandir", lambda path: scanned.append(path) or original_scandir(path))
+
+    # Act: an unchanged tree is not listed again
+    unchanged = list(discover_repos([root], cache_dir))
+    scanned_unchanged = list(scanned)
+    # A new repository changes the mtime of its parent, so only that part is scanned again
+    repo_c = make_repo(tmp_path / "root" / "group" / "c")
+    changed = list(discover_repos([root], cache_dir))
+
+    # Assert
+    assert (cache_dir / "discovery-index.json").exists()
+    assert unchanged == [repo_a, repo_b]
+    assert scanned_unchanged == []
+    assert changed == [repo_a, repo_b, repo_c]
+    assert tmp_path / "root" / "a" not in scanned
+
+
+def test_explicit_entries_override_discovered_features(tmp_path):
+    """Test that a ManagedRepos entry wins over the discovered entry of the same repository."""
+    # Arrange
+    repo_a, repo_b = make_tree(tmp_path / "root")
+    config_entries = ConfigEntries(
+        ManagedRepos=[ConfigEntry(local_path=repo_b, features=["default", "precommit"])],
+        DiscoveryRoots=[DiscoveryRoot(path=tmp_path / "root", max_depth=2)],
+    )
+
+    # Act
+    entries = expand_config_entries(config_entries)
+
+    # Assert
+    assert [(entry.local_path, entry.features) for entry in entries] == [
+        (repo_b, ["default", "precommit"]),
+        (repo_a, ["default"]),
+    ]
+
+
+def test_load_config_with_discovery_roots(setup_config_file, tmp_path):
+    """Test that load_config includes discovered repositories, also ones added after the snapshot."""
+    # Arrange
+    config = yaml.safe_load(setup_config_file.read_text())
+    config["DiscoveryRoots"] = [{"path": str(tmp_path / "discovered"), "max_depth": 1}]
+    setup_config_file.write_text(yaml.dump(config))
+    repo = make_repo(tmp_path / "discovered" / "new-site")
+    cache_dir = tmp_path / "cache"
+
+    # Act
+    repoconfigs = load_config(setup_config_file, cache_dir)
+    # A repository added later is found although config.yaml has not changed
+    another = make_repo(tmp_path / "discovered" / "another-site")
+    reloaded = load_config(setup_config_file, cache_dir)
+
+    # Assert
+    assert [repoconfig.local_path for repoconfig in repoconfigs][-1] == repo
+    assert repoconfigs[-1].siteinfo.site_name == "new-site"
+    assert [repoconfig.local_path for repoconfig in reloaded][-2:] == [another, repo]
@@ -0,0 +1,72 @@
+import json
+import pytest
+
+from io import StringIO
+from doc_flesh import sync_pipeline
+from doc_flesh.events import EventEmitter, emit
+from doc_flesh.sync_pipeline import run_sync_pipeline
+
+
+@pytest.fixture
+def jsonl_stream(monkeypatch) -> StringIO:
+    """Fixture that switches the process-wide emitter to jsonl mode and returns its stream."""
+    stream = StringIO()
+    emitter = EventEmitter()
+    emitter.configure("jsonl", stream)
+    monkeypatch.setattr("doc_flesh.events.EMITTER", emitter)
+    return stream
+
+
+def read_events(stream: StringIO) -> list[dict]:
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_text_mode_prints_only_the_message(capsys):
+    """Test that text mode prints the message of an event and nothing for events without one."""
+    # Act
+    emit("committed", "/tmp/repo", message="📝 Committed", sha="abc")
+    emit("rendered", "/tmp/repo", file="README.md")
+
+    # Assert
+    assert capsys.readouterr().out == "📝 Committed\n"
+
+
+def test_jsonl_mode_writes_one_event_per_line(jsonl_stream, capsys):
+    """Test that jsonl mode writes the fields of an event, without its message, to the stream only."""
+    # Act
+    emit("committed", "/tmp/repo", message="📝 Committed", sha="abc", duration=0.1234567891)
+
+    # Assert
+    events = read_events(jsonl_stream)
+    assert len(events) == 1
+    assert events[0]["event"] == "committed"
+    assert events[0]["repo"] == "/tmp/repo"
+    assert events[0]["sha"] == "abc"
+    assert events[0]["duration"] == 0.123457
+    assert "message" not in events[0]
+    assert capsys.readouterr().out == ""
+
+
+def test_unknown_output_format():
+    """Test that an unknown output format is rejected."""
+    # Act & Assert
+    with pytest.raises(ValueError):
+        EventEmitter().configure("xml")
+
+
+def test_sync_pipeline_events(setup_repos, monkeypatch, jsonl_stream, fake_apply_jinja_template):
+    """Test that a parallel sync reports staging, committing and pushing as events."""
+    # Arrange
+    monkeypatch.setattr(sync_pipeline, "apply_jinja_template", fake_apply_jinja_template)
+    repo_config = setup_repos.repo_config
+    repo_config.jinja_files = ["rendered.txt"]
+
+    # Act
+    run_sync_pipeline([repo_config], jobs=2)
+
+    # Assert
+    events = read_events(jsonl_stream)
+    assert [event["event"] for event in events] == ["staged", "committed", "pushed"]
+    assert all(event["repo"] == str(repo_config.local_path) for event in events)
+    assert all(event["duration"] >= 0 for event in events)
+    assert events[1]["sha"] == setup_repos.local_repo.head.commit.hexsha
@@ -0,0 +1,157 @@
+import os
+import pytest
+import yaml
+
+from pathlib import Path
+
+from doc_flesh.configtools.config_reader import load_config
+from doc_flesh.configtools.feature_resolver import FeatureResolver, flags_to_mask, mask_to_flags
+from doc_flesh.configtools.reverse_index import build_reverse_index
+from doc_flesh.models import RepoConfigFlags
+
+
+def write_feature(features_dir: Path, name: str, **data) -> Path:
+    """Write features_dir/NAME.yaml with the given fields."""
+    path = features_dir / f"{name}.yaml"
+    path.write_text(yaml.dump(data))
+    # Make sure that a rewrite within the same clock tick still changes the signature
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    return path
+
+
+@pytest.fixture
+def features_dir(tmp_path: Path) -> Path:
+    """Fixture with three features: default, mathjax (which includes default) and precommit."""
+    features_dir = tmp_path / "features"
+    features_dir.mkdir()
+    write_feature(features_dir, "default", jinja_files=["mkdocs.yml", "README.md"], static_files=["ci.yaml"])
+    write_feature(
+        features_dir, "mathjax", includes=["default"], jinja_files=["mkdocs.yml", "extra.md"],
+        static_files=["mathjax.js"], flags={"site_uses_mathjax": True},
+    )
+    write_feature(features_dir, "precommit", static_files=["ci.yaml", ".pre-commit-config.yaml"],
+                  flags={"site_uses_precommit": True})
+    return features_dir
+
+
+def test_flag_mask_round_trip():
+    """Test that flags survive the conversion to a bit mask and back."""
+    # Arrange
+    flags = RepoConfigFlags(site_uses_mathjax=False, site_uses_precommit=True)
+
+    # Act
+    round_trip = mask_to_flags(flags_to_mask(flags))
+    empty_mask = flags_to_mask(RepoConfigFlags())
+
+    # Assert
+    assert round_trip == flags
+    assert empty_mask == 0
+
+
+def test_resolve_keeps_the_first_position_of_each_file(features_dir):
+    """Test that a file listed by several features is kept once, where it was first listed."""
+    # Arrange
+    resolver = FeatureResolver()
+
+    # Act
+    resolved = resolver.resolve(features_dir, ["precommit", "default"])
+
+    # Assert
+    assert resolved.jinja_files == (Path("mkdocs.yml"), Path("README.md"))
+    assert resolved.static_files == (Path("ci.yaml"), Path(".pre-commit-config.yaml"))
+    assert mask_to_flags(resolved.flags) == RepoConfigFlags(site_uses_precommit=True)
+
+
+def test_resolve_follows_includes(features_dir):
+    """Test that the files and flags of included features are part of the result."""
+    # Arrange
+    resolver = FeatureResolver()
+
+    # Act
+    resolved = resolver.resolve(features_dir, ["mathjax", "precommit"])
+
+    # Assert: the included feature comes first
+    assert resolved.jinja_files == (Path("mkdocs.yml"), Path("README.md"), Path("extra.md"))
+    assert resolved.static_files == (Path("ci.yaml"), Path("mathjax.js"), Path(".pre-commit-config.yaml"))
+    assert mask_to_flags(resolved.flags) == RepoConfigFlags(site_uses_mathjax=True, site_uses_precommit=True)
+    assert [path.stem for path in resolved.sources] == ["default", "mathjax", "precommit"]
+
+
+def test_resolve_is_memoized_and_interned(features_dir):
+    """Test that a feature list is resolved once and that equal paths are shared between results."""
+    # Arrange
+    resolver = FeatureResolver()
+
+    # Act
+    first = resolver.resolve(features_dir, ["default", "precommit"])
+    again = resolver.resolve(features_dir, ["default", "precommit"])
+    other = resolver.resolve(features_dir, ["mathjax"])
+
+    # Assert: the same path of different combinations is one object
+    assert again is first
+    assert other.jinja_files[0] is first.jinja_files[0]
+
+
+def test_refresh_recompiles_features_that_include_a_changed_feature(features_dir):
+    """Test that refresh keeps unchanged features and recompiles the includers of a changed one."""
+    # Arrange
+    resolver = FeatureResolver()
+    first = resolver.resolve(features_dir, ["mathjax"])
+
+    # Act
+    resolver.refresh()
+    unchanged = resolver.resolve(features_dir, ["mathjax"])
+    write_feature(features_dir, "default", jinja_files=["index.md"])
+    resolver.refresh()
+    changed = resolver.resolve(features_dir, ["mathjax"])
+
+    # Assert
+    assert unchanged is first
+    assert changed.jinja_files == (Path("index.md"), Path("mkdocs.yml"), Path("extra.md"))
+
+
+def test_include_cycles_are_reported(features_dir):
+    """Test that features including each other raise an error naming the cycle."""
+    # Arrange
+    write_feature(features_dir, "a", includes=["b"])
+    write_feature(features_dir, "b", includes=["a"])
+
+    # Act & Assert
+    with pytest.raises(ValueError, match="a -> b -> a"):
+        FeatureResolver().resolve(features_dir, ["a"])
+
+
+def test_load_config_and_reverse_index_follow_includes(setup_config_file, tmp_path):
+    """Test that an included feature is an input of the config snapshot and of the reverse index."""
+    # Arrange
+    features_dir = setup_config_file.parent / "features"
+    write_feature(features_dir, "feature2", includes=["feature1"], jinja_files=["feature_2_specific_file.md"])
+    cache_dir = tmp_path / "cache"
+
+    # Act
+    repo_2 = load_config(setup_config_file, cache_dir)[1]
+    # An included feature is an input of the snapshot entry, too
+    write_feature(features_dir, "feature1", jinja_files=["renamed.toml"])
+    reloaded_repo_2 = load_config(setup_config_file, cache_dir)[1]
+    index = build_reverse_index(setup_config_file)
+
+    # Assert
+    assert repo_2.flags.site_uses_mathjax
+    assert Path("feature_1_specific_file.toml") in repo_2.jinja_files
+    assert Path("renamed.toml") in reloaded_repo_2.jinja_files
+    assert not reloaded_repo_2.flags.site_uses_mathjax
+    assert repo_2.local_path in index["features/feature1.yaml"]
+
+
+def test_load_config_reports_include_cycles(setup_config_file, capsys):
+    """Test that a cycle in the includes of the features is reported like a missing feature."""
+    # Arrange
+    features_dir = setup_config_file.parent / "features"
+    write_feature(features_dir, "feature1", includes=["feature2"])
+    write_feature(features_dir, "feature2", includes=["feature1"])
+
+    # Act & Assert
+    with pytest.raises(ValueError):
+        load_config(setup_config_file)
+    assert "❌ The includes of your features form a cycle." in capsys.readouterr().out
@@ -1,5 +1,8 @@
-from doc_flesh.git_utils import is_repo_safe, commit_and_push, add_to_staging, add_uv_lock_to_staging
+from doc_flesh import git_utils
+from doc_flesh.git_utils import is_repo_safe, commit_and_push, add_to_staging, add_uv_lock_to_staging, commit_files, check_all, get_repo_status
+from doc_flesh.models import RepoConfig
 from git import Repo
+from pathlib import Path
 
 
 def test_repo_safe_clean_repo(setup_repos):
@@ -145,6 +148,52 @@ def test_commit_no_changes(setup_repos):
     log = list(setup_repos.local_repo.iter_commits("main"))
     assert len(log) == 1  # Only the initial commit should exist
 
+def test_add_to_staging_only_changed_files(setup_repos):
+    """Test that only the given changed files are staged and their staged paths are returned."""
+    # Arrange
+    repo_config = setup_repos.repo_config
+    repo_config.jinja_files = ["changed.txt", "untouched.txt"]
+    (setup_repos.local_path / "changed.txt").write_text("New content")
+    (setup_repos.local_path / "untouched.txt").write_text("Not managed by this run")
+
+    # Act
+    staged = add_to_staging(repo_config, [Path("changed.txt")])
+    cached = setup_repos.local_repo.git.diff("--name-only", "--cached").splitlines()
+    commit_and_push(repo_config, staged)
+
+    # Assert
+    assert staged == ["changed.txt"]
+    assert cached == ["changed.txt"]
+    assert setup_repos.remote_repo.git.ls_tree("HEAD", "changed.txt", name_only=True) == "changed.txt"
+
+def test_add_to_staging_ignored_managed_file(setup_repos):
+    """Test that a managed file is staged even if the repository's .gitignore matches it."""
+    # Arrange
+    repo_config = setup_repos.repo_config
+    repo_config.static_files = ["docs/generated.js"]
+    (setup_repos.local_path / ".gitignore").write_text("docs/\n")
+    (setup_repos.local_path / "docs").mkdir()
+    (setup_repos.local_path / "docs" / "generated.js").write_text("// managed")
+
+    # Act
+    staged = add_to_staging(repo_config, [Path("docs/generated.js")])
+
+    # Assert
+    assert staged == ["docs/generated.js"]
+
+def test_add_to_staging_without_changes_skips_the_index(setup_repos):
+    """Test that nothing is staged and the index is not rewritten when no files changed."""
+    # Arrange
+    index_path = setup_repos.local_path / ".git" / "index"
+    mtime_before = index_path.stat().st_mtime_ns
+
+    # Act
+    staged = add_to_staging(setup_repos.repo_config, [])
+
+    # Assert
+    assert staged == []
+    assert index_path.stat().st_mtime_ns == mtime_before
+
 def test_add_uv_lock_to_staging(setup_repos):
     """Test that add_uv_lock_to_staging correctly adds uv.lock to the staging area."""
     repo_config = setup_repos.repo_config
@@ -225,3 +274,120 @@ def test_add_uv_lock_commit_and_push(setup_repos):
     remote_files = [line.split()[-1] for line in remote_files]
 
     assert "uv.lock" in remote_files
+
+def test_check_all_parallel(setup_repos, capsys):
+    """Test check_all with multiple jobs keeps the result and prints the output in config order."""
+    # Arrange
+    missing_repo = RepoConfig(local_path=setup_repos.temp_dir / "missing")
+    repoconfigs = [setup_repos.repo_config, missing_repo, setup_repos.repo_config]
+
+    # Act & Assert: all safe
+    assert check_all([setup_repos.repo_config] * 3, jobs=3) is True
+    capsys.readouterr()
+
+    # Act: one missing repo in the middle
+    all_safe = check_all(repoconfigs, jobs=3)
+
+    # Assert
+    assert all_safe is False
+    out = capsys.readouterr().out
+    checked = [line for line in out.splitlines() if line.startswith("Checking ")]
+    assert checked == [f"Checking {repoconfig.local_path}..." for repoconfig in repoconfigs]
+
+def test_repo_safe_remote_head_is_cached(setup_repos):
+    """Test that the probed remote head is trusted for remote_ttl seconds."""
+    # Arrange: probe the remote once, then someone else pushes to it
+    first = is_repo_safe(setup_repos.repo_config)
+    second_local_path = setup_repos.temp_dir / "second-local"
+    second_local = Repo.clone_from(str(setup_repos.remote_path), str(second_local_path))
+    (second_local_path / "test.txt").write_text("Remote change")
+    second_local.git.commit("-am", "Change from second local")
+    second_local.git.push("origin", "main")
+
+    # Act
+    within_ttl = is_repo_safe(setup_repos.repo_config, remote_ttl=3600)
+    without_ttl = is_repo_safe(setup_repos.repo_config, remote_ttl=0)
+
+    # Assert: within the TTL the cached remote head is used. With TTL 0 the remote is asked again.
+    assert first is True
+    assert within_ttl is True
+    assert without_ttl is False
+
+def test_get_repo_status(setup_repos):
+    """Test that get_repo_status reports the branch, HEAD, upstream and dirtiness."""
+    # Arrange
+    head_sha = setup_repos.local_repo.head.commit.hexsha
+
+    # Act
+    status = get_repo_status(setup_repos.local_repo)
+    # Modify a tracked file and commit something locally
+    (setup_repos.local_path / "test.txt").write_text("Changed")
+    setup_repos.local_repo.git.commit("-am", "Local change")
+    (setup_repos.local_path / "test.txt").write_text("Changed again")
+    changed_status = get_repo_status(setup_repos.local_repo)
+
+    # Assert
+    assert status.branch == "main"
+    assert not status.detached
+    assert status.head_sha == head_sha
+    assert status.upstream == "origin/main"
+    assert (status.ahead, status.behind) == (0, 0)
+    assert not status.dirty
+    assert status.in_progress == []
+    assert changed_status.dirty
+    assert changed_status.ahead == 1
+
+def test_repo_safe_ahead_of_upstream_skips_the_remote(setup_repos, monkeypatch):
+    """Test that a repo with unpushed commits is not safe and the remote is not asked."""
+    # Arrange
+    (setup_repos.local_path / "test.txt").write_text("Changed")
+    setup_repos.local_repo.git.commit("-am", "Unpushed change")
+    probed = []
+    monkeypatch.setattr(git_utils, "probe_remote_head", lambda *args: probed.append(args))
+
+    # Act
+    safe = is_repo_safe(setup_repos.repo_config)
+
+    # Assert
+    assert safe is False
+    assert probed == []
+
+def test_repo_safe_merge_in_progress(setup_repos):
+    """Test is_repo_safe returns False when a merge is in progress."""
+    # Arrange
+    head_sha = setup_repos.local_repo.head.commit.hexsha
+    (setup_repos.local_path / ".git" / "MERGE_HEAD").write_text(head_sha)
+
+    # Act
+    status = get_repo_status(setup_repos.local_repo)
+    safe = is_repo_safe(setup_repos.repo_config)
+
+    # Assert
+    assert status.in_progress == ["merge"]
+    assert safe is False
+
+def test_commit_files_with_plumbing(setup_repos):
+    """Test that the plumbing engine commits changed and new nested files and leaves a clean index."""
+    # Arrange
+    repo = setup_repos.local_repo
+    repo_config = setup_repos.repo_config
+    (setup_repos.local_path / "test.txt").write_text("Changed content")
+    nested = setup_repos.local_path / ".github" / "workflows" / "deploy.yaml"
+    nested.parent.mkdir(parents=True)
+    nested.write_text("name: Deploy")
+    head_before = repo.head.commit
+
+    # Act
+    committed = commit_files(repo_config, [Path("test.txt"), Path(".github/workflows/deploy.yaml")])
+    commit = repo.head.commit
+    # Committing the same content again does nothing
+    committed_again = commit_files(repo_config, [Path("test.txt")])
+
+    # Assert
+    assert committed
+    assert commit.parents == (head_before,)
+    assert repo.git.show("HEAD:test.txt") == "Changed content"
+    assert repo.git.show("HEAD:.github/workflows/deploy.yaml") == "name: Deploy"
+    assert repo.git.status("--porcelain", "--untracked-files=no") == ""
+    assert not committed_again
+    assert repo.head.commit == commit
@@ -0,0 +1,108 @@
+import os
+
+from pathlib import Path
+from click.testing import CliRunner
+from jinja2 import Environment, FileSystemLoader
+
+from doc_flesh.cli import cli
+from doc_flesh.models import FileChange, RepoConfig, SiteInfo, SiteCategory
+from doc_flesh.plan import count_changed_lines, format_diff, plan_repo, print_plan
+from doc_flesh.target_file_writer import StaticManifest
+
+
+def make_repoconfig(tmp_path: Path) -> tuple[RepoConfig, Environment, StaticManifest]:
+    """Create a template, a static file and a repository with one file up to date and two pending."""
+    template_dir = tmp_path / "templates"
+    template_dir.mkdir()
+    (template_dir / "README.md").write_text("# {{ site_name }}\n")
+    (template_dir / "mkdocs.yml").write_text("site_name: {{ site_name }}\n")
+    static_dir = tmp_path / "static"
+    static_dir.mkdir()
+    (static_dir / "deploy.yaml").write_text("name: Deploy\n")
+
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "README.md").write_text("# Old name\n")
+    (repo / "mkdocs.yml").write_text("site_name: Test Repo")  # Jinja drops the trailing newline
+
+    repoconfig = RepoConfig(
+        local_path=repo,
+        jinja_files=[Path("README.md"), Path("mkdocs.yml")],
+        static_files=[Path("deploy.yaml")],
+        siteinfo=SiteInfo(site_name="Test Repo", site_name_slug="test-repo", category=SiteCategory.learning_tools),
+    )
+    environment = Environment(loader=FileSystemLoader(template_dir))
+    return repoconfig, environment, StaticManifest(static_dir)
+
+
+def test_plan_repo_lists_only_changed_files(tmp_path):
+    """Test that only the files that would change are planned and nothing is written."""
+    # Arrange: plus a static file with the source's content but an older mtime
+    repoconfig, environment, manifest = make_repoconfig(tmp_path)
+    (manifest.base_dir / "up-to-date.yaml").write_text("name: Up to date\n")
+    up_to_date = repoconfig.local_path / "up-to-date.yaml"
+    up_to_date.write_text("name: Up to date\n")
+    os.utime(up_to_date, ns=(1_000_000_000, 1_000_000_000))
+    repoconfig.static_files.append(Path("up-to-date.yaml"))
+
+    # Act
+    changes = plan_repo(repoconfig, manifest, environment)
+
+    # Assert
+    assert [change.path for change in changes] == [Path("README.md"), Path("deploy.yaml")]
+    assert changes[0].old == b"# Old name\n" and changes[0].new == b"# Test Repo"
+    assert changes[1].old is None
+    # Nothing is written
+    assert (repoconfig.local_path / "README.md").read_text() == "# Old name\n"
+    assert not (repoconfig.local_path / "deploy.yaml").exists()
+    assert up_to_date.stat().st_mtime_ns == 1_000_000_000
+
+
+def test_format_diff():
+    """Test the unified diff of a changed, a new and a binary file."""
+    # Arrange
+    change = FileChange(path=Path("README.md"), old=b"# Old name\n", new=b"# Test Repo\n")
+    new_file = FileChange(path=Path("deploy.yaml"), new=b"name: Deploy\n")
+    binary = FileChange(path=Path("logo.png"), old=b"\xff\x00", new=b"\xfe\x00")
+
+    # Act
+    change_diff = format_diff(change)
+    new_file_diff = format_diff(new_file)
+    binary_diff = format_diff(binary)
+
+    # Assert
+    assert change_diff.splitlines() == [
+        "--- a/README.md", "+++ b/README.md", "@@ -1 +1 @@", "-# Old name", "+# Test Repo",
+    ]
+    assert count_changed_lines(change) == (1, 1)
+    assert new_file_diff.startswith("--- /dev/null\n+++ b/deploy.yaml\n")
+    assert binary_diff == "Binary files a/logo.png and b/logo.png differ\n"
+
+
+def test_print_plan(tmp_path, capsys):
+    """Test that the --stat summary lists the added and removed lines of each pending file."""
+    # Arrange
+    repoconfig, environment, manifest = make_repoconfig(tmp_path)
+
+    # Act
+    pending = print_plan([repoconfig], stat=True, manifest=manifest, environment=environment)
+    output = capsys.readouterr().out
+
+    # Assert
+    assert pending == 2
+    assert "README.md | +1 -1" in output
+    assert "deploy.yaml | +1 -0" in output
+
+
+def test_sync_rejects_ignored_option_combinations():
+    """Test that sync options which would be silently ignored are rejected."""
+    # Arrange
+    runner = CliRunner()
+
+    # Act
+    stat_only = runner.invoke(cli, ["sync", "--stat"])
+    plan_and_dry_run = runner.invoke(cli, ["sync", "--plan", "--dry-run"])
+
+    # Assert
+    assert stat_only.exit_code == 2 and "--stat can only be used with --plan" in stat_only.output
+    assert plan_and_dry_run.exit_code == 2 and "--plan cannot be combined" in plan_and_dry_run.output
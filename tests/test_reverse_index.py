@@ -0,0 +1,104 @@
+import pytest
+import yaml
+
+from click.testing import CliRunner
+from pathlib import Path
+
+from doc_flesh.cli import cli
+from doc_flesh.configtools import reverse_index
+from doc_flesh.configtools.config_reader import load_config
+from doc_flesh.configtools.reverse_index import affected_repos, build_reverse_index, load_reverse_index
+
+
+def test_build_reverse_index(setup_config_file):
+    """Test that every template, static file and feature maps to the repos using it."""
+    # Arrange
+    repo_1 = setup_config_file.parent.parent / "repo_1"
+    repo_2 = setup_config_file.parent.parent / "repo_2"
+
+    # Act
+    index = build_reverse_index(setup_config_file)
+
+    # Assert
+    assert index["templates/mkdocs.yaml"] == [repo_1, repo_2]
+    assert index["templates/feature_1_specific_file.toml"] == [repo_1]
+    assert index["static/feature_2_specific_static_file.yaml"] == [repo_2]
+    assert index["features/feature1.yaml"] == [repo_1]
+    assert index["config.yaml"] == [repo_1, repo_2]
+
+
+def test_reverse_index_follows_includes(setup_config_file):
+    """Test that a template included by a managed template affects the same repos."""
+    # Arrange
+    template_dir = setup_config_file.parent / "templates"
+    template_dir.mkdir()
+    (template_dir / "feature_1_specific_file.toml").write_text("{% include 'partials/common.toml' %}")
+
+    # Act
+    index = build_reverse_index(setup_config_file)
+
+    # Assert
+    assert index["templates/partials/common.toml"] == [setup_config_file.parent.parent / "repo_1"]
+
+
+def test_affected_repos(setup_config_file, tmp_path):
+    """Test the query with relative, absolute and siteinfo.json paths."""
+    # Arrange
+    repo_1 = setup_config_file.parent.parent / "repo_1"
+    repo_2 = setup_config_file.parent.parent / "repo_2"
+    cache_dir = tmp_path / "cache"
+
+    # Act
+    by_template = affected_repos([Path("templates/feature_1_specific_file.toml")], setup_config_file, cache_dir)
+    by_feature = affected_repos([setup_config_file.parent / "features" / "default.yaml"], setup_config_file, cache_dir)
+    by_siteinfo = affected_repos([repo_2 / "siteinfo.json"], setup_config_file, cache_dir)
+    by_unused = affected_repos([Path("templates/unused.md")], setup_config_file, cache_dir)
+
+    # Assert
+    assert by_template == [repo_1]
+    assert by_feature == [repo_1, repo_2]
+    assert by_siteinfo == [repo_2]
+    assert by_unused == []
+    assert (cache_dir / "reverse-index.json").exists()
+    assert load_reverse_index(setup_config_file, cache_dir) == build_reverse_index(setup_config_file)
+
+
+def test_load_config_only(setup_config_file):
+    """Test that load_config can load a subset of the repos."""
+    # Arrange
+    repo_2 = setup_config_file.parent.parent / "repo_2"
+
+    # Act
+    repo_configs = load_config(setup_config_file, only={repo_2})
+
+    # Assert
+    assert [repo_config.local_path for repo_config in repo_configs] == [repo_2]
+
+
+def test_build_reverse_index_missing_feature(setup_config_file):
+    """Test that a feature without a file is reported together with the repo using it."""
+    # Arrange
+    config = yaml.safe_load(setup_config_file.read_text())
+    config["ManagedRepos"][1]["features"].append("does-not-exist")
+    setup_config_file.write_text(yaml.dump(config))
+
+    # Act & Assert
+    with pytest.raises(FileNotFoundError, match="does-not-exist.yaml.*repo_2"):
+        build_reverse_index(setup_config_file)
+
+
+def test_affected_command_reports_missing_feature(monkeypatch):
+    """Test that `doc-flesh affected` exits with an error message instead of a traceback."""
+    # Arrange
+    def missing_feature(*args, **kwargs):
+        raise FileNotFoundError("Feature configuration not found: features/does-not-exist.yaml")
+
+    monkeypatch.setattr(reverse_index, "affected_repos", missing_feature)
+
+    # Act
+    result = CliRunner().invoke(cli, ["affected", "templates/mkdocs.yml"])
+
+    # Assert
+    assert result.exit_code == 1
+    assert "does-not-exist.yaml" in result.output
+    assert not isinstance(result.exception, FileNotFoundError)
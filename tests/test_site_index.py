@@ -0,0 +1,100 @@
+import json
+import os
+
+from pathlib import Path
+
+from doc_flesh.configtools import site_index
+from doc_flesh.configtools.site_index import build_site_index, write_site_index
+from doc_flesh.models import SiteCategory, SiteInfo
+
+
+def make_site(path: Path, name: str, category: SiteCategory) -> Path:
+    """Create a repository directory with a valid siteinfo.json."""
+    path.mkdir(parents=True)
+    siteinfo = SiteInfo(site_name=name, site_name_slug=path.name, category=category)
+    (path / "siteinfo.json").write_text(siteinfo.model_dump_json())
+    return path
+
+
+def test_build_site_index_groups_by_category(tmp_path):
+    """Test that every category is present and its sites are sorted by name."""
+    # Arrange
+    local_paths = [
+        make_site(tmp_path / "b", "Beta", SiteCategory.learning_tools),
+        make_site(tmp_path / "a", "Alpha", SiteCategory.learning_tools),
+        make_site(tmp_path / "c", "Gamma", SiteCategory.templates),
+    ]
+
+    # Act
+    document, errors = build_site_index(local_paths, jobs=2)
+
+    # Assert
+    assert errors == {}
+    assert list(document["categories"]) == [category.value for category in SiteCategory]
+    assert [site["site_name"] for site in document["categories"]["Learning tools"]] == ["Alpha", "Beta"]
+    assert document["categories"]["Templates"] == [{"site_name": "Gamma", "site_name_slug": "c", "related_repo": ""}]
+    assert document["categories"]["Inactive"] == []
+
+
+def test_build_site_index_reports_invalid_and_missing_files(tmp_path):
+    """Test that invalid and missing siteinfo.json files are reported and left out of the index."""
+    # Arrange
+    valid = make_site(tmp_path / "valid", "Valid", SiteCategory.learning_tools)
+    invalid = make_site(tmp_path / "invalid", "Invalid", SiteCategory.learning_tools)
+    (invalid / "siteinfo.json").write_text(json.dumps({"site_name": "Invalid", "category": "Unknown"}))
+    missing = tmp_path / "missing"
+    missing.mkdir()
+
+    # Act
+    document, errors = build_site_index([valid, invalid, missing])
+
+    # Assert
+    assert list(errors) == [invalid, missing]
+    assert errors[invalid].startswith("Invalid siteinfo.json")
+    assert [site["site_name"] for site in document["categories"]["Learning tools"]] == ["Valid"]
+
+
+def test_build_site_index_rereads_only_changed_files(tmp_path, monkeypatch):
+    """Test that with a state file only the siteinfo.json files whose (mtime, size) changed are read again."""
+    # Arrange
+    site_a = make_site(tmp_path / "a", "Alpha", SiteCategory.learning_tools)
+    site_b = make_site(tmp_path / "b", "Beta", SiteCategory.learning_tools)
+    state_path = tmp_path / "cache" / "site-index-state.json"
+    build_site_index([site_a, site_b], state_path=state_path)
+    validated = []
+    original = SiteInfo.model_validate_json
+    monkeypatch.setattr(
+        site_index.SiteInfo, "model_validate_json", lambda data: validated.append(data) or original(data)
+    )
+
+    # Act: nothing changed, then the siteinfo.json of site_b changes
+    unchanged, _ = build_site_index([site_a, site_b], state_path=state_path)
+    validated_unchanged = list(validated)
+    siteinfo = json.loads((site_b / "siteinfo.json").read_text())
+    siteinfo["category"] = SiteCategory.inactive.value
+    (site_b / "siteinfo.json").write_text(json.dumps(siteinfo))
+    os.utime(site_b / "siteinfo.json", ns=(0, 0))
+    changed, _ = build_site_index([site_a, site_b], state_path=state_path)
+
+    # Assert
+    assert state_path.exists()
+    assert validated_unchanged == []
+    assert len(unchanged["categories"]["Learning tools"]) == 2
+    assert len(validated) == 1
+    assert [site["site_name"] for site in changed["categories"]["Inactive"]] == ["Beta"]
+
+
+def test_write_site_index_skips_unchanged_content(tmp_path):
+    """Test that the index file is written only when its content changes."""
+    # Arrange
+    output_path = tmp_path / "out" / "site-index.json"
+    document = {"categories": {"Templates": []}}
+
+    # Act
+    written = write_site_index(document, output_path)
+    written_again = write_site_index(document, output_path)
+
+    # Assert
+    assert written
+    assert json.loads(output_path.read_text()) == document
+    assert not written_again
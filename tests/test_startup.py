@@ -0,0 +1,25 @@
+import subprocess
+import sys
+
+import pytest
+
+# Importing these up front made `doc-flesh version` take about 0.5 s instead of 0.1 s.
+HEAVY_MODULES = ["git", "jinja2", "jinja2_time", "pydantic", "questionary", "yaml"]
+
+
+@pytest.mark.parametrize("args", [["version"], ["--help"], ["sync", "--help"]])
+def test_cli_does_not_import_heavy_modules(args):
+    """Test that the CLI starts without importing the dependencies of the commands."""
+    # Arrange
+    code = (
+        "import sys\n"
+        "from doc_flesh.cli import cli\n"
+        f"cli({args!r}, standalone_mode=False)\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+
+    # Act
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+
+    # Assert
+    assert output.splitlines()[-1] == ""
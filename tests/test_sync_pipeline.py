@@ -0,0 +1,146 @@
+import pytest
+
+from doc_flesh import sync_pipeline
+from doc_flesh.models import RepoConfig
+from doc_flesh.sync_pipeline import run_sync_pipeline
+from doc_flesh.sync_state import SyncState
+
+
+def test_run_sync_pipeline_commits_and_pushes(setup_repos, monkeypatch, fake_apply_jinja_template):
+    """Test that a changed file gets committed and pushed to the remote."""
+    # Arrange
+    monkeypatch.setattr(sync_pipeline, "apply_jinja_template", fake_apply_jinja_template)
+    repo_config = setup_repos.repo_config
+    repo_config.jinja_files = ["rendered.txt"]
+
+    # Act
+    results = run_sync_pipeline([repo_config], jobs=2)
+
+    # Assert
+    assert not results[0].failed
+    assert results[0].committed and results[0].pushed
+    remote_files = setup_repos.remote_repo.git.ls_tree("HEAD", r=True, name_only=True).splitlines()
+    assert "rendered.txt" in remote_files
+
+
+def test_run_sync_pipeline_with_plumbing_engine(setup_repos, monkeypatch, fake_apply_jinja_template):
+    """Test that the plumbing commit engine commits without staging and pushes the commit."""
+    # Arrange
+    monkeypatch.setattr(sync_pipeline, "apply_jinja_template", fake_apply_jinja_template)
+    repo_config = setup_repos.repo_config
+    repo_config.jinja_files = ["rendered.txt"]
+
+    # Act
+    results = run_sync_pipeline([repo_config], commit_engine="plumbing")
+
+    # Assert
+    assert results[0].committed and results[0].pushed
+    assert setup_repos.remote_repo.git.show("HEAD:rendered.txt") == "Rendered content"
+    assert setup_repos.local_repo.git.status("--porcelain", "--untracked-files=no") == ""
+
+@pytest.mark.parametrize("commit_engine", ["index", "plumbing"])
+def test_run_sync_pipeline_commits_untracked_up_to_date_file(setup_repos, monkeypatch, commit_engine):
+    """Test that a managed file already on disk with the right content, but not tracked, is committed."""
+    # Arrange: this run writes nothing, because docs/b.js already has the rendered content
+    monkeypatch.setattr(sync_pipeline, "apply_jinja_template", lambda repoconfig, syncer=None: [])
+    repo_config = setup_repos.repo_config
+    repo_config.jinja_files = ["docs/b.js"]
+    (setup_repos.local_path / "docs").mkdir()
+    (setup_repos.local_path / "docs" / "b.js").write_text("Rendered content")
+    (setup_repos.local_path / ".git" / "info" / "exclude").write_text("docs/\n")  # Managed files are committed anyway
+
+    # Act
+    results = run_sync_pipeline([repo_config], commit_engine=commit_engine)
+
+    # Assert
+    assert results[0].committed and results[0].pushed
+    assert setup_repos.remote_repo.git.show("HEAD:docs/b.js") == "Rendered content"
+    assert setup_repos.local_repo.git.status("--porcelain", "--", "docs/b.js") == ""
+
+
+def test_run_sync_pipeline_no_commit(setup_repos, monkeypatch, fake_apply_jinja_template):
+    """Test that --no-commit stages the files but does not create a commit."""
+    # Arrange
+    monkeypatch.setattr(sync_pipeline, "apply_jinja_template", fake_apply_jinja_template)
+    repo_config = setup_repos.repo_config
+    repo_config.jinja_files = ["rendered.txt"]
+
+    # Act
+    results = run_sync_pipeline([repo_config], no_commit=True)
+
+    # Assert
+    assert not results[0].committed and not results[0].pushed
+    assert len(list(setup_repos.local_repo.iter_commits("main"))) == 1
+    assert "rendered.txt" in setup_repos.local_repo.git.diff("--name-only", "--cached")
+
+
+def test_run_sync_pipeline_failure_does_not_stop_others(setup_repos, monkeypatch, fake_apply_jinja_template):
+    """Test that a failing repository is reported and the next one is still synced."""
+    # Arrange
+    monkeypatch.setattr(sync_pipeline, "apply_jinja_template", fake_apply_jinja_template)
+    repo_config = setup_repos.repo_config
+    repo_config.jinja_files = ["rendered.txt"]
+    broken = RepoConfig(local_path=setup_repos.temp_dir / "not-a-repo", jinja_files=["rendered.txt"])
+    broken.local_path.mkdir()
+
+    # Act
+    results = run_sync_pipeline([broken, repo_config], jobs=2)
+
+    # Assert
+    assert results[0].failed
+    assert not results[1].failed
+    assert results[1].pushed
+
+
+def test_run_sync_pipeline_skips_unchanged_repo(setup_repos, monkeypatch):
+    """Test that a repository without changed files never touches Git."""
+    # Arrange
+    monkeypatch.setattr(sync_pipeline, "apply_jinja_template", lambda repoconfig, syncer=None: [])
+    broken = RepoConfig(local_path=setup_repos.temp_dir / "not-a-repo")
+
+    # Act
+    results = run_sync_pipeline([broken])
+
+    # Assert
+    assert not results[0].failed
+    assert not results[0].committed
+
+
+def test_run_sync_pipeline_skips_repo_with_unchanged_inputs(setup_repos, monkeypatch, make_digester, fake_apply_jinja_template):
+    """Test that a repository is skipped when its inputs have not changed since the last sync."""
+    # Arrange
+    monkeypatch.setattr(sync_pipeline, "apply_jinja_template", fake_apply_jinja_template)
+    repo_config = setup_repos.repo_config
+    repo_config.jinja_files = ["rendered.txt"]
+    digester = make_digester(setup_repos.temp_dir)
+    (setup_repos.temp_dir / "templates" / "rendered.txt").write_text("Rendered content")
+    state = SyncState(setup_repos.temp_dir / "sync-state.json")
+
+    # Act
+    first = run_sync_pipeline([repo_config], state=state, digester=digester)
+    second = run_sync_pipeline([repo_config], state=state, digester=digester)
+
+    # Assert
+    assert first[0].pushed and not first[0].skipped
+    assert second[0].skipped and not second[0].committed
+
+
+def test_run_sync_pipeline_force_keeps_the_state_of_other_repos(setup_repos, monkeypatch, make_digester, fake_apply_jinja_template):
+    """Test that force syncs a repository with unchanged inputs and keeps the digests of other repos."""
+    # Arrange
+    monkeypatch.setattr(sync_pipeline, "apply_jinja_template", fake_apply_jinja_template)
+    repo_config = setup_repos.repo_config
+    repo_config.jinja_files = ["rendered.txt"]
+    digester = make_digester(setup_repos.temp_dir)
+    (setup_repos.temp_dir / "templates" / "rendered.txt").write_text("Rendered content")
+    state = SyncState(setup_repos.temp_dir / "sync-state.json")
+    state.update(setup_repos.temp_dir / "other-repo", "digest-of-other-repo")
+    run_sync_pipeline([repo_config], state=state, digester=digester)
+
+    # Act
+    forced = run_sync_pipeline([repo_config], state=state, digester=digester, force=True)
+
+    # Assert
+    assert not forced[0].skipped
+    assert state.is_current(setup_repos.temp_dir / "other-repo", "digest-of-other-repo")
+    assert state.is_current(repo_config.local_path, digester.repo_digest(repo_config))
@@ -0,0 +1,51 @@
+from pathlib import Path
+
+from doc_flesh.models import RepoConfig, RepoConfigFlags
+from doc_flesh.sync_state import SyncState
+
+
+def test_repo_digest_follows_inputs(tmp_path, make_digester):
+    """Test that the digest changes when any input changes, including included templates."""
+    # Arrange
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "mkdocs.yml").write_text("{% include 'nav.yml' %}\nsite_name: {{ site_name }}")
+    (tmp_path / "templates" / "nav.yml").write_text("nav: []")
+    (tmp_path / "static").mkdir()
+    (tmp_path / "static" / "asset.js").write_text("let a = 1;")
+    repoconfig = RepoConfig(
+        local_path=tmp_path / "repo",
+        jinja_files=[Path("mkdocs.yml")],
+        static_files=[Path("asset.js")],
+    )
+
+    # Act
+    original = make_digester(tmp_path).repo_digest(repoconfig)
+    unchanged = make_digester(tmp_path).repo_digest(repoconfig)
+    # Edit an included template
+    (tmp_path / "templates" / "nav.yml").write_text("nav: [index.md]")
+    included_changed = make_digester(tmp_path).repo_digest(repoconfig)
+    # Change a flag
+    repoconfig.flags = RepoConfigFlags(site_uses_mathjax=True)
+    flag_changed = make_digester(tmp_path).repo_digest(repoconfig)
+
+    # Assert
+    assert unchanged == original
+    assert included_changed != original
+    assert flag_changed != included_changed
+
+
+def test_sync_state_roundtrip(tmp_path):
+    """Test that the recorded digests survive a save and load."""
+    # Arrange
+    state_path = tmp_path / "cache" / "sync-state.json"
+    state = SyncState(state_path)
+    state.update(Path("/repo"), "abc")
+
+    # Act
+    state.save()
+    reloaded = SyncState(state_path)
+
+    # Assert
+    assert reloaded.is_current(Path("/repo"), "abc")
+    assert not reloaded.is_current(Path("/repo"), "def")
+    assert not reloaded.is_current(Path("/other"), "abc")
@@ -1,8 +1,11 @@
 import os
+import pytest
 import shutil
+import threading
 from pathlib import Path
 from jinja2 import Template
-from doc_flesh.target_file_writer import render_jinja_to_file, make_file_readonly, render_static_to_file
+from doc_flesh import target_file_writer
+from doc_flesh.target_file_writer import render_jinja_to_file, make_file_readonly, render_static_to_file, copy_static_files, stream_to_file, DirectorySyncer, StaticManifest, get_jinja_environment
 from doc_flesh.models import RepoConfig
 
 def test_render_jinja_to_file_with_existing_file(tmp_path):
@@ -34,6 +37,89 @@ def test_render_jinja_to_file_with_nonexistent_file(tmp_path):
     assert output_file.read_text() == "Hello, World!"
     assert not os.access(output_file, os.W_OK)  # File should be read-only
 
+def test_render_jinja_to_file_reports_changes(tmp_path):
+    # Setup
+    output_file = tmp_path / "output.txt"
+    jinja_template = Template("Hello, {{ name }}!")
+
+    # Act
+    created = render_jinja_to_file(jinja_template, output_file, {"name": "World"})
+    changed = render_jinja_to_file(jinja_template, output_file, {"name": "Moon"})
+
+    # Assert
+    assert created is True
+    assert changed is True
+    assert output_file.read_text() == "Hello, Moon!"
+
+def test_render_jinja_to_file_identical_output_is_not_written(tmp_path):
+    # Setup
+    existing_file = tmp_path / "output.txt"
+    existing_file.write_text("Hello, World!")
+    make_file_readonly(existing_file)
+    os.utime(existing_file, ns=(1_000_000_000, 1_000_000_000))
+
+    jinja_template = Template("Hello, {{ name }}!")
+
+    # Act
+    changed = render_jinja_to_file(jinja_template, existing_file, {"name": "World"})
+
+    # Assert
+    assert changed is False
+    assert existing_file.stat().st_mtime_ns == 1_000_000_000  # File was not touched
+
+def test_stream_to_file_partial_matches(tmp_path):
+    # Setup: outputs that share a prefix with the existing file, or are a prefix of it
+    output_file = tmp_path / "output.txt"
+    output_file.write_text("Hello, World!")
+
+    # Act
+    shared_prefix = stream_to_file(output_file, [b"Hello, ", b"Moon!"])
+    shared_prefix_content = output_file.read_text()
+    is_prefix = stream_to_file(output_file, [b"Hello"])
+    is_prefix_content = output_file.read_text()
+    identical = stream_to_file(output_file, [b"Hel", b"lo"])
+
+    # Assert
+    assert shared_prefix is True
+    assert shared_prefix_content == "Hello, Moon!"
+    assert is_prefix is True
+    assert is_prefix_content == "Hello"
+    assert identical is False
+    assert output_file.stat().st_mode & 0o777 == 0o444
+    assert [path.name for path in tmp_path.iterdir()] == ["output.txt"]  # No temporary files left
+
+def test_stream_to_file_failure_keeps_the_old_file(tmp_path):
+    # Setup
+    output_file = tmp_path / "output.txt"
+    output_file.write_text("Old content")
+
+    def chunks():
+        yield b"New "
+        raise RuntimeError("Template error")
+
+    # Act
+    with pytest.raises(RuntimeError):
+        stream_to_file(output_file, chunks())
+
+    # Assert
+    assert output_file.read_text() == "Old content"
+    assert [path.name for path in tmp_path.iterdir()] == ["output.txt"]
+
+def test_directory_syncer_collects_written_directories(tmp_path, monkeypatch):
+    # Setup
+    fsynced = []
+    monkeypatch.setattr(os, "fsync", fsynced.append)
+    syncer = DirectorySyncer()
+
+    # Act
+    render_jinja_to_file(Template("a"), tmp_path / "a.txt", {}, syncer)
+    render_jinja_to_file(Template("b"), tmp_path / "b.txt", {}, syncer)
+    render_jinja_to_file(Template("c"), tmp_path / "docs" / "c.txt", {}, syncer)
+    syncer.sync()
+
+    # Assert
+    assert len(fsynced) == 2  # One per directory, not one per file
+
 def test_render_static_to_file_with_nonexistent_file(tmp_path):
     # Setup
     src_file = tmp_path / "source.txt"
@@ -61,3 +147,103 @@ def test_render_static_to_file_with_existing_readonly_file(tmp_path):
     # Assert
     assert dest_file.read_text() == "Updated static content"
     assert not os.access(dest_file, os.W_OK)  # File should be read-only
+
+def test_copy_static_files_with_manifest(tmp_path):
+    # Setup: one static source shared by two repositories
+    static_dir = tmp_path / "static"
+    (static_dir / "docs").mkdir(parents=True)
+    (static_dir / "docs" / "asset.js").write_text("console.log('hi');")
+    repo_1 = RepoConfig(local_path=tmp_path / "repo_1", static_files=[Path("docs/asset.js")])
+    repo_2 = RepoConfig(local_path=tmp_path / "repo_2", static_files=[Path("docs/asset.js")])
+
+    # Act: the first run copies to both repositories
+    manifest = StaticManifest(static_dir)
+    assert copy_static_files(repo_1, manifest) == [Path("docs/asset.js")]
+    assert copy_static_files(repo_2, manifest) == [Path("docs/asset.js")]
+    assert manifest.files_copied == 2
+    assert manifest.bytes_copied == 2 * len("console.log('hi');")
+
+    # Act: the second run copies nothing
+    manifest = StaticManifest(static_dir)
+    assert copy_static_files(repo_1, manifest) == []
+    assert copy_static_files(repo_2, manifest) == []
+    assert manifest.files_skipped == 2
+    assert manifest.bytes_copied == 0
+
+def test_copy_static_files_detects_same_size_change(tmp_path):
+    # Setup: destination has different content with the same size and a different mtime
+    static_dir = tmp_path / "static"
+    static_dir.mkdir()
+    (static_dir / "file.txt").write_text("AAAA")
+    repo = RepoConfig(local_path=tmp_path / "repo", static_files=[Path("file.txt")])
+    repo.local_path.mkdir()
+    (repo.local_path / "file.txt").write_text("BBBB")
+    os.utime(repo.local_path / "file.txt", ns=(1_000_000_000, 1_000_000_000))
+
+    # Act
+    written = copy_static_files(repo, StaticManifest(static_dir))
+
+    # Assert
+    assert written == [Path("file.txt")]
+    assert (repo.local_path / "file.txt").read_text() == "AAAA"
+
+def test_copy_static_files_aligns_the_mtime_of_identical_files(tmp_path):
+    # Setup: destination has the same content but a different mtime, e.g. copied by an older version
+    static_dir = tmp_path / "static"
+    static_dir.mkdir()
+    (static_dir / "file.txt").write_text("AAAA")
+    repo = RepoConfig(local_path=tmp_path / "repo", static_files=[Path("file.txt")])
+    repo.local_path.mkdir()
+    (repo.local_path / "file.txt").write_text("AAAA")
+    os.utime(repo.local_path / "file.txt", ns=(1_000_000_000, 1_000_000_000))
+
+    # Act
+    written = copy_static_files(repo, StaticManifest(static_dir))
+
+    # Assert: nothing is copied, and the next run does not need to hash the destination
+    assert written == []
+    assert (repo.local_path / "file.txt").stat().st_mtime_ns == (static_dir / "file.txt").stat().st_mtime_ns
+
+def test_source_digest_does_not_block_other_files(tmp_path, monkeypatch):
+    # Setup: hashing large.bin blocks until released
+    (tmp_path / "large.bin").write_bytes(b"large")
+    (tmp_path / "small.txt").write_text("small")
+    release = threading.Event()
+    original_digest = target_file_writer.file_digest
+
+    def slow_digest(path):
+        if path.name == "large.bin":
+            release.wait(5)
+        return original_digest(path)
+
+    monkeypatch.setattr(target_file_writer, "file_digest", slow_digest)
+    manifest = StaticManifest(tmp_path)
+    thread = threading.Thread(target=manifest.source_digest, args=(Path("large.bin"),))
+
+    # Act: hash small.txt while large.bin is being hashed
+    thread.start()
+    try:
+        digest = manifest.source_digest(Path("small.txt"))
+
+        # Assert
+        assert thread.is_alive()
+        assert digest == original_digest(tmp_path / "small.txt")
+    finally:
+        release.set()
+        thread.join()
+
+def test_get_jinja_environment_is_shared_and_caches_bytecode(tmp_path):
+    # Setup
+    template_dir = tmp_path / "templates"
+    template_dir.mkdir()
+    (template_dir / "README.md").write_text("# {{ site_name }}")
+    cache_dir = tmp_path / "cache"
+
+    # Act
+    environment = get_jinja_environment(template_dir, cache_dir)
+    template = environment.get_template("README.md")
+
+    # Assert
+    assert get_jinja_environment(template_dir, cache_dir) is environment
+    assert template.render(site_name="Test") == "# Test"
+    assert any(cache_dir.iterdir())  # Bytecode was written to disk
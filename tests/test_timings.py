@@ -0,0 +1,60 @@
+import json
+
+from doc_flesh.timings import TimingRecorder, RECORDER, percentile, span, timed
+from doc_flesh.models import RepoConfig
+
+
+def test_percentile():
+    """Test the nearest-rank percentile, including an empty list."""
+    # Arrange
+    values = [float(i) for i in range(1, 101)]
+
+    # Act
+    median = percentile(values, 50)
+    p95 = percentile(values, 95)
+    empty = percentile([], 50)
+
+    # Assert
+    assert median == 50.0
+    assert p95 == 95.0
+    assert empty == 0.0
+
+
+def test_spans_are_grouped_by_repo_and_phase(monkeypatch, tmp_path):
+    """Test that nested spans inherit the repo and that the report has fleet statistics."""
+    # Arrange
+    recorder = TimingRecorder()
+    recorder.enabled = True
+    monkeypatch.setattr("doc_flesh.timings.RECORDER", recorder)
+
+    @timed("render")
+    def render(repoconfig: RepoConfig):
+        with span("render.template"):
+            pass
+
+    # Act
+    render(RepoConfig(local_path=tmp_path / "repo_1"))
+    render(RepoConfig(local_path=tmp_path / "repo_2"))
+    with span("load_config"):
+        pass
+    report = recorder.report()
+    recorder.write_report(tmp_path / "timings.json")
+
+    # Assert
+    assert set(report["repos"]) == {str(tmp_path / "repo_1"), str(tmp_path / "repo_2")}
+    assert set(report["repos"][str(tmp_path / "repo_1")]) == {"render", "render.template"}
+    assert set(report["global"]) == {"load_config"}
+    assert report["fleet"]["render"]["count"] == 2
+    assert json.loads((tmp_path / "timings.json").read_text()) == report
+    assert len(recorder.slowest_repos(1)) == 1
+
+
+def test_spans_are_not_recorded_when_disabled():
+    """Test that the global recorder ignores spans unless --timings enabled it."""
+    # Act
+    with span("load_config"):
+        pass
+
+    # Assert
+    assert not RECORDER.enabled
+    assert RECORDER.report()["global"] == {}
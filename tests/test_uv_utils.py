@@ -3,7 +3,8 @@ from pathlib import Path
 import subprocess
 
 from doc_flesh.models import RepoConfig
-from doc_flesh.uv_utils import update_uv_dependencies
+from doc_flesh import uv_utils
+from doc_flesh.uv_utils import update_uv_dependencies, group_by_dependencies
 
 
 def test_update_uv_dependencies_success(tmp_path, mock_subprocess_run):
@@ -71,3 +72,126 @@ def test_update_uv_dependencies_command_not_found(tmp_path, mock_subprocess_run)
     # Assertions
     assert result is False
     assert len(mock_subprocess_run.called_with_args) == 1
+
+
+def test_update_uv_dependencies_collects_all_failures(tmp_path, mock_subprocess_run):
+    """Test that all repositories are processed even if they fail, and fail_fast stops early."""
+    # Arrange
+    repos = []
+    for name in ["repo1", "repo2", "repo3"]:
+        (tmp_path / name).mkdir()
+        repos.append(RepoConfig(local_path=tmp_path / name))
+    mock_subprocess_run.should_fail = True
+
+    # Act
+    result = update_uv_dependencies(repos)
+    calls = len(mock_subprocess_run.called_with_args)
+    mock_subprocess_run.reset()
+    mock_subprocess_run.should_fail = True
+    fail_fast_result = update_uv_dependencies(repos, fail_fast=True)
+    fail_fast_calls = len(mock_subprocess_run.called_with_args)
+
+    # Assert
+    assert result is False
+    assert calls == 3
+    assert fail_fast_result is False
+    assert fail_fast_calls == 1
+
+
+def test_update_uv_dependencies_parallel_shared_cache(tmp_path, mock_subprocess_run):
+    """Test that parallel runs point every uv process at the same cache directory."""
+    # Arrange
+    repos = []
+    for name in ["repo1", "repo2", "repo3"]:
+        (tmp_path / name).mkdir()
+        repos.append(RepoConfig(local_path=tmp_path / name))
+    uv_cache_dir = tmp_path / "uv-cache"
+
+    # Act
+    result = update_uv_dependencies(repos, jobs=3, uv_cache_dir=uv_cache_dir)
+
+    # Assert
+    assert result is True
+    called_dirs = sorted(kwargs["cwd"] for _, kwargs in mock_subprocess_run.called_with_args)
+    assert called_dirs == sorted(str(repo.local_path) for repo in repos)
+    assert all(kwargs["env"]["UV_CACHE_DIR"] == str(uv_cache_dir) for _, kwargs in mock_subprocess_run.called_with_args)
+
+
+PYPROJECT = """
+[project]
+name = "{name}"
+version = "0.1.0"
+requires-python = ">=3.12"
+dependencies = [{dependencies}]
+"""
+
+def test_update_uv_dependencies_reuses_locks(tmp_path, mock_subprocess_run):
+    """Test that repos with identical dependencies are resolved once and the lock is reused."""
+    # Arrange
+    repos = []
+    for name, dependencies in [("a", '"mkdocs"'), ("b", '"mkdocs"'), ("c", '"mkdocs", "pytest"'), ("d", '"mkdocs"')]:
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "pyproject.toml").write_text(PYPROJECT.format(name=name, dependencies=dependencies))
+        repos.append(RepoConfig(local_path=tmp_path / name))
+    (tmp_path / "a" / "uv.lock").write_text("Upgraded lock of a")
+
+    # Act
+    groups = group_by_dependencies(repos)
+    result = update_uv_dependencies(repos)
+
+    # Assert: grouping ignores the project name
+    assert [[repo.local_path.name for repo in group] for group in groups] == [["a", "b", "d"], ["c"]]
+    assert result is True
+    calls = [(args[0], kwargs["cwd"]) for args, kwargs in mock_subprocess_run.called_with_args]
+    assert calls == [
+        (["uv", "lock", "--upgrade"], str(tmp_path / "a")),
+        (["uv", "lock", "--upgrade"], str(tmp_path / "c")),
+        (["uv", "lock"], str(tmp_path / "b")),
+        (["uv", "lock"], str(tmp_path / "d")),
+    ]
+    assert (tmp_path / "b" / "uv.lock").read_text() == "Upgraded lock of a"
+    assert (tmp_path / "d" / "uv.lock").read_text() == "Upgraded lock of a"
+
+
+def test_group_by_dependencies_malformed_pyproject(tmp_path):
+    """Test that a repo with a malformed pyproject.toml gets a group of its own instead of an error."""
+    # Arrange
+    repos = []
+    for name in ["a", "broken", "b"]:
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "pyproject.toml").write_text(PYPROJECT.format(name=name, dependencies='"mkdocs"'))
+        repos.append(RepoConfig(local_path=tmp_path / name))
+    (tmp_path / "broken" / "pyproject.toml").write_text("[project\nname = ")
+
+    # Act
+    groups = group_by_dependencies(repos)
+
+    # Assert
+    assert [[repo.local_path.name for repo in group] for group in groups] == [["a", "b"], ["broken"]]
+
+
+@pytest.mark.parametrize("fail_fast", [False, True])
+def test_update_uv_dependencies_restores_member_locks(tmp_path, monkeypatch, fail_fast):
+    """Test that a member keeps its own uv.lock if its re-lock fails or is skipped after a failure."""
+    # Arrange: a and b share their dependencies, c fails to upgrade
+    repos = []
+    for name, dependencies in [("a", '"mkdocs"'), ("c", '"pytest"'), ("b", '"mkdocs"')]:
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "pyproject.toml").write_text(PYPROJECT.format(name=name, dependencies=dependencies))
+        (tmp_path / name / "uv.lock").write_text(f"Original lock of {name}")
+        repos.append(RepoConfig(local_path=tmp_path / name))
+
+    def fake_run(args, cwd, **kwargs):
+        if cwd in (str(tmp_path / "b"), str(tmp_path / "c")):
+            raise subprocess.CalledProcessError(1, args, b"Mock error output")
+        (tmp_path / "a" / "uv.lock").write_text("Upgraded lock of a")
+        return subprocess.CompletedProcess(args=args, returncode=0, stdout=b"", stderr=b"")
+
+    monkeypatch.setattr(uv_utils.subprocess, "run", fake_run)
+
+    # Act
+    result = update_uv_dependencies(repos, fail_fast=fail_fast)
+
+    # Assert
+    assert result is False
+    assert (tmp_path / "b" / "uv.lock").read_text() == "Original lock of b"
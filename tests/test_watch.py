@@ -0,0 +1,160 @@
+import json
+import pytest
+import yaml
+
+from pathlib import Path
+from jinja2 import Environment, FileSystemLoader
+
+from doc_flesh.watch import InotifyWatcher, PollingWatcher, WatchSession, wait_for_changes
+
+
+def test_polling_watcher_reports_changed_files(tmp_path):
+    """Test that the polling watcher reports modified, deleted and created files exactly once."""
+    # Arrange
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "a.txt").write_text("a")
+    (tmp_path / "b.txt").write_text("b")
+    watcher = PollingWatcher()
+    watcher.add(tmp_path, recursive=True)
+
+    # Act
+    (tmp_path / "sub" / "a.txt").write_text("changed")
+    (tmp_path / "b.txt").unlink()
+    (tmp_path / "c.txt").write_text("c")
+    changed = watcher.read(0)
+    changed_again = watcher.read(0)
+
+    # Assert
+    assert changed == {tmp_path / "sub" / "a.txt", tmp_path / "b.txt", tmp_path / "c.txt"}
+    assert changed_again == set()
+
+
+def test_inotify_watcher_reports_changed_files(tmp_path):
+    """Test that the inotify watcher reports changed files, also in subdirectories created later."""
+    # Arrange
+    try:
+        watcher = InotifyWatcher()
+    except OSError:
+        pytest.skip("inotify is not available")
+
+    try:
+        watcher.add(tmp_path, recursive=True)
+
+        # Act
+        (tmp_path / "a.txt").write_text("a")
+        (tmp_path / "sub").mkdir()
+        changed = watcher.read(1)
+        # The new subdirectory is watched as well
+        (tmp_path / "sub" / "b.txt").write_text("b")
+        changed_in_new_subdirectory = watcher.read(1)
+        changed_again = watcher.read(0)
+    finally:
+        watcher.close()
+
+    # Assert
+    assert tmp_path / "a.txt" in changed
+    assert changed_in_new_subdirectory == {tmp_path / "sub" / "b.txt"}
+    assert changed_again == set()
+
+
+def test_wait_for_changes_debounces_bursts():
+    """Test that a burst of changes is returned as one set, without the changes after the burst."""
+    # Arrange
+    class FakeWatcher:
+        def __init__(self, batches):
+            self.batches = batches
+
+        def read(self, timeout=None):
+            return self.batches.pop(0) if self.batches else set()
+
+    watcher = FakeWatcher([set(), {Path("a")}, {Path("b")}, set(), {Path("c")}])
+
+    # Act
+    changed = wait_for_changes(watcher, debounce=0)
+
+    # Assert
+    assert changed == {Path("a"), Path("b")}
+
+
+@pytest.fixture
+def watch_session(setup_config_file: Path) -> WatchSession:
+    """A WatchSession for the config of the setup_config_file fixture, with all templates and static files."""
+    config_dir = setup_config_file.parent
+    for name in ["mkdocs.yaml", "pyproject.toml", "README.md", "feature_1_specific_file.toml", "feature_2_specific_file.md"]:
+        (config_dir / "templates").mkdir(exist_ok=True)
+        (config_dir / "templates" / name).write_text("{{ site_name }}")
+    for name in [".github/workflows/mkdocs-merge.yaml", "feature_1_specific_static_file.yaml", "feature_2_specific_static_file.yaml"]:
+        (config_dir / "static" / name).parent.mkdir(parents=True, exist_ok=True)
+        (config_dir / "static" / name).write_text("static")
+
+    environment = Environment(loader=FileSystemLoader(config_dir / "templates"))
+    return WatchSession(setup_config_file, environment=environment)
+
+
+def test_watch_session_renders_only_affected_repos(watch_session, capsys):
+    """Test that a changed template is planned only for the repos using it."""
+    # Arrange
+    config_dir = watch_session.config_dir
+    repo_1, repo_2 = list(watch_session.repoconfigs)
+
+    # Act
+    pending = watch_session.handle({config_dir / "templates" / "feature_1_specific_file.toml"})
+    output = capsys.readouterr().out
+
+    # Assert
+    assert pending == 6  # repo_1 has none of its 6 managed files yet
+    assert "1 repos affected" in output
+    assert str(repo_1) in output and str(repo_2) not in output
+    assert not (repo_1 / "feature_1_specific_file.toml").exists()  # Nothing is written
+
+
+def test_watch_session_follows_new_includes(watch_session, capsys):
+    """Test that a template included after the session started affects the repos of its includer."""
+    # Arrange: feature_1_specific_file.toml (used by repo_1) starts to include a new partial
+    config_dir = watch_session.config_dir
+    repo_1, repo_2 = list(watch_session.repoconfigs)
+    (config_dir / "templates" / "partials").mkdir()
+    partial = config_dir / "templates" / "partials" / "new.toml"
+    partial.write_text("[tool.new]")
+    includer = config_dir / "templates" / "feature_1_specific_file.toml"
+    includer.write_text("{% include 'partials/new.toml' %}")
+    watch_session.handle({includer})
+    capsys.readouterr()
+
+    # Act
+    watch_session.handle({partial})
+
+    # Assert
+    output = capsys.readouterr().out
+    assert "1 repos affected" in output
+    assert str(repo_1) in output and str(repo_2) not in output
+
+
+def test_watch_session_reloads_siteinfo(watch_session, capsys):
+    """Test that a changed siteinfo.json is read again and its repo is planned."""
+    # Arrange
+    repo_2 = list(watch_session.repoconfigs)[1]
+    siteinfo_path = repo_2 / "siteinfo.json"
+    siteinfo = yaml.safe_load(siteinfo_path.read_text())
+    siteinfo["site_name"] = "Renamed Repo"
+    siteinfo_path.write_text(json.dumps(siteinfo))
+
+    # Act
+    watch_session.handle({siteinfo_path})
+
+    # Assert
+    assert watch_session.repoconfigs[repo_2].siteinfo.site_name == "Renamed Repo"
+    assert "+Renamed Repo" in capsys.readouterr().out
+
+
+def test_watch_session_ignores_unrelated_files(watch_session, capsys):
+    """Test that a file which is not an input of any repo is ignored."""
+    # Arrange
+    repo_1 = list(watch_session.repoconfigs)[0]
+
+    # Act
+    pending = watch_session.handle({repo_1 / "notes.txt"})
+
+    # Assert
+    assert pending == 0
+    assert capsys.readouterr().out == ""